@@ -5,22 +5,44 @@ Web-based monitoring for Genesys SIP Server
 Monitors logs from network-mounted directory
 """
 
-from flask import Flask, jsonify, render_template_string
+from flask import Flask, Response, jsonify, render_template_string, request
 from flask_cors import CORS
 import re
 import glob
+import json
 import os
+import sys
+import ctypes
+import ctypes.util
+import fnmatch
+import select
+import struct
+from collections import deque
 from datetime import datetime
 from pathlib import Path
 import threading
 import time
+import queue
 
 app = Flask(__name__)
 CORS(app)
 
 # Configuration
 LOG_PATH = os.getenv('LOG_PATH', '/logs')
-LOG_PATTERN = os.path.join(LOG_PATH, 'SIP_P-001.*.log')
+LOG_NAME_PATTERN = 'SIP_P-001.*.log'
+LOG_PATTERN = os.path.join(LOG_PATH, LOG_NAME_PATTERN)
+BACKFILL_LOGS = int(os.getenv('BACKFILL_LOGS', '1'))  # older rotations replayed on startup
+TIMESTAMPED_LINE_RE = re.compile(r'\d{2}:\d{2}:\d{2}\.\d{3}')  # ends a SIP message, at any hour
+TAIL_READ_SIZE = 16 * 1024 * 1024  # appended bytes read from the log per step
+MESSAGE_LOOKAHEAD = 25  # lines parse_register_block reads from a message start
+DEBOUNCE_DELAY = 0.2  # seconds of writes handled in one pass
+POLL_INTERVAL = 2  # seconds between stats where inotify is not available
+RESCAN_INTERVAL = float(os.getenv('RESCAN_INTERVAL', '30'))  # seconds between log globs at most
+NETWORK_FILESYSTEMS = ('nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', '9p', 'fuse.sshfs')  # no remote inotify
+EVENTS_SHOWN = 50  # recent events on the page and in /api/events
+STREAM_QUEUE_SIZE = 100  # deltas buffered per /api/stream client before it is dropped
+STREAM_KEEPALIVE = 15  # seconds between keep-alive comments on an idle stream
+CHANGE_LOG_SIZE = 10000  # changes kept for /api/changes; older clients get the full state
 
 # Global state
 current_registrations = {}
@@ -32,7 +54,9 @@ stats = {
     'failed_attempts': 0,
     'unique_dns': set()
 }
-last_parsed_line = 0
+log_handle = None  # current_log_file, kept open across checks and renames
+log_identity = None  # its (st_dev, st_ino)
+carry = b''  # raw tail held back until its message is complete
 current_log_file = None
 monitor_status = {'running': False, 'error': None, 'last_check': None}
 
@@ -48,6 +72,16 @@ def find_latest_log():
         monitor_status['error'] = f"Error finding log files: {e}"
         return None
 
+def find_log_files():
+    """Find all rotated SIP log files, oldest first"""
+    try:
+        log_files = glob.glob(LOG_PATTERN)
+        log_files.sort(key=lambda x: Path(x).stat().st_mtime)
+        return log_files
+    except Exception as e:
+        monitor_status['error'] = f"Error finding log files: {e}"
+        return []
+
 def parse_register_block(lines, start_idx):
     """Parse a REGISTER request and response"""
     timestamp_match = re.search(r'(\d{2}:\d{2}:\d{2}\.\d{3})', lines[start_idx])
@@ -72,7 +106,7 @@ def parse_register_block(lines, start_idx):
     for i in range(start_idx, min(start_idx + 25, len(lines))):
         line = lines[i].strip()
         
-        if not line or (line.startswith('22:') or line.startswith('23:') or line.startswith('00:') or line.startswith('01:') or line.startswith('02:')):
+        if not line or TIMESTAMPED_LINE_RE.match(line):
             if i > start_idx + 5:
                 break
         
@@ -115,12 +149,320 @@ def parse_register_block(lines, start_idx):
         'status': status
     }
 
+def process_lines(lines):
+    """Apply the REGISTER/200 OK blocks in lines to the dashboard state"""
+    with updates.lock:
+        i = 0
+        while i < len(lines):
+            line = lines[i]
+            
+            # Look for REGISTER messages
+            if ('SIPTR: Received' in line or 'Sending' in line) and i + 1 < len(lines):
+                if 'REGISTER' in lines[i+1] or 'SIP/2.0 200 OK' in lines[i+1]:
+                    result = parse_register_block(lines, i)
+                    
+                    if result['dn']:
+                        # Update stats
+                        stats['unique_dns'].add(result['dn'])
+                        
+                        if 'REGISTER' in lines[i+1]:
+                            stats['total_requests'] += 1
+                        
+                        if result['status'] == '200 OK':
+                            if result['expires'] and result['expires'] > 0:
+                                stats['successful_registrations'] += 1
+                                # Update current registrations
+                                current_registrations[result['dn']] = {
+                                    'contact': result['contact'],
+                                    'expires': result['expires'],
+                                    'last_updated': result['timestamp'],
+                                    'source_ip': result['source_ip'],
+                                    'status': 'Registered'
+                                }
+                                updates.registration(result['dn'], current_registrations[result['dn']])
+                            else:
+                                stats['unregistrations'] += 1
+                                # Remove from registrations
+                                if result['dn'] in current_registrations:
+                                    del current_registrations[result['dn']]
+                                    updates.registration(result['dn'], None)
+                        
+                        elif result['status'] and '200' not in result['status']:
+                            stats['failed_attempts'] += 1
+                        
+                        # Add to events history (keep last 100)
+                        events_history.append(result)
+                        updates.event(result)
+                        if len(events_history) > 100:
+                            events_history.pop(0)
+            
+            i += 1
+
+def read_new_lines(f, carry):
+    """Read up to TAIL_READ_SIZE bytes appended to the open log f
+    
+    Returns (lines, carry): the decoded lines ready to parse and the raw
+    bytes held back for the next read - a partial last line, or a message
+    start whose headers are still being written (no blank line after it yet).
+    """
+    data = f.read(TAIL_READ_SIZE)
+    raw_lines = (carry + data).splitlines(keepends=True)
+    
+    keep = len(raw_lines)
+    if raw_lines and not raw_lines[-1].endswith(b'\n'):
+        keep -= 1
+    for i in range(keep - 1, max(keep - MESSAGE_LOOKAHEAD, 0) - 1, -1):
+        if not raw_lines[i].strip():
+            break
+        if b'SIPTR: Received' in raw_lines[i] or b'Sending' in raw_lines[i]:
+            keep = i
+            break
+    
+    text = b''.join(raw_lines[:keep]).decode('utf-8', errors='ignore')
+    return text.splitlines(keepends=True), b''.join(raw_lines[keep:])
+
+def read_to_end(f, carry):
+    """Parse the open log f up to its current size, return the new carry"""
+    size = os.fstat(f.fileno()).st_size
+    if size < f.tell():
+        print(f"[!] Log file truncated, reading from the start: {f.name}")
+        f.seek(0)
+        carry = b''
+    while f.tell() < size:
+        lines, carry = read_new_lines(f, carry)
+        process_lines(lines)
+    return carry
+
+def file_identity(path):
+    """(st_dev, st_ino) of a file, which a rename keeps and a new log does not"""
+    stat = os.stat(path)
+    return stat.st_dev, stat.st_ino
+
+def backfill_rotated_logs(log_file):
+    """Replay the rotations before log_file so earlier registrations are not lost"""
+    older = [f for f in find_log_files() if f != log_file]
+    for path in (older[-BACKFILL_LOGS:] if BACKFILL_LOGS > 0 else []):
+        print(f"[*] Replaying rotated log: {path}")
+        # In TAIL_READ_SIZE chunks, so the lock is released between them
+        with open(path, 'rb') as f:
+            tail = read_to_end(f, b'')
+        process_lines(tail.decode('utf-8', errors='ignore').splitlines(keepends=True))
+
+def mount_fstype(directory):
+    """Filesystem type of the mount holding directory (Linux /proc), None if unknown"""
+    path = os.path.realpath(directory)
+    best, fstype = '', None
+    try:
+        with open('/proc/self/mounts') as f:
+            for line in f:
+                fields = line.split()
+                mount_point = fields[1].replace('\\040', ' ')
+                inside = path == mount_point or path.startswith(mount_point.rstrip('/') + '/')
+                if inside and len(mount_point) > len(best):
+                    best, fstype = mount_point, fields[2]
+    except OSError:
+        return None
+    return fstype
+
+class LogWatcher:
+    """Wake the monitor as soon as a SIP log is appended to or created
+    
+    On Linux the log directory is watched with inotify, through ctypes so no
+    extra package is needed. On Windows, on network mounts (where writes by
+    the remote SIP Server raise no inotify events) or when inotify cannot be
+    set up, the directory and the current log are stat()ed every
+    POLL_INTERVAL instead - two stats rather than a glob of every log.
+    """
+    IN_MODIFY = 0x002
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_Q_OVERFLOW = 0x4000
+    EVENT = struct.Struct('iIII')  # wd, mask, cookie, name length; the name follows
+    
+    def __init__(self, directory):
+        self.directory = directory
+        self.fd = None
+        self.signature = None  # polling: (directory mtime, log size, log mtime) at the last wake-up
+        if sys.platform.startswith('linux') and mount_fstype(directory) not in NETWORK_FILESYSTEMS:
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+                fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+                mask = self.IN_MODIFY | self.IN_CREATE | self.IN_MOVED_TO
+                if fd >= 0 and libc.inotify_add_watch(fd, os.fsencode(directory), mask) >= 0:
+                    self.fd = fd
+                elif fd >= 0:
+                    os.close(fd)
+            except (OSError, AttributeError):
+                pass
+        print(f"[*] Watching {directory} with {'inotify' if self.fd is not None else 'polling'}")
+    
+    def wait(self, log_file, timeout):
+        """Block until log_file or the directory changes, or timeout seconds pass
+        
+        Changes that happened since the previous wait() return at once. Returns
+        True when a log may have been created (or on timeout), i.e. when the
+        caller should look for the latest log again.
+        """
+        if self.fd is None:
+            return self._poll(log_file, timeout)
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return True
+        
+        # Debounce: let a burst of writes settle, then handle it in one pass
+        time.sleep(DEBOUNCE_DELAY)
+        created = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return created
+            pos = 0
+            while pos < len(data):
+                _, mask, _, length = self.EVENT.unpack_from(data, pos)
+                pos += self.EVENT.size
+                name = os.fsdecode(data[pos:pos + length].rstrip(b'\0'))
+                pos += length
+                if mask & self.IN_Q_OVERFLOW:
+                    created = True
+                elif mask & (self.IN_CREATE | self.IN_MOVED_TO) and fnmatch.fnmatch(name, LOG_NAME_PATTERN):
+                    created = True
+    
+    def _stat(self, log_file):
+        try:
+            directory = os.stat(self.directory).st_mtime_ns
+            log = os.stat(log_file) if log_file else None
+        except OSError:
+            return None
+        return directory, log and log.st_size, log and log.st_mtime_ns
+    
+    def _poll(self, log_file, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            signature = self._stat(log_file)
+            if signature != self.signature:
+                created = self.signature is None or signature is None or signature[0] != self.signature[0]
+                self.signature = signature
+                return created
+            if time.monotonic() >= deadline:
+                return True
+            time.sleep(POLL_INTERVAL)
+
+def sse_message(event, data):
+    """One Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+class UpdateStream:
+    """Sequence the dashboard changes and fan them out to /api/stream subscribers
+    
+    process_lines holds the lock while it changes the state and records every
+    registration change and event under the next sequence number, in a bounded
+    change log that /api/changes and the stream deltas are built from. The
+    monitor publishes once per pass: subscribers at the same sequence share one
+    serialized delta, and one whose queue is full is dropped rather than
+    blocking the monitor.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {}  # queue -> last sequence sent to it
+        # Microseconds since the epoch: a restarted dashboard starts above any
+        # sequence of its previous run, so clients from before get a full reset
+        self.sequence = time.time_ns() // 1000
+        self.changes = deque(maxlen=CHANGE_LOG_SIZE)  # (sequence, dn or None for an event, change)
+        self.updated = time.time()
+    
+    def registration(self, dn, info):
+        """Record a registration change, info None once removed; caller holds the lock"""
+        self.sequence += 1
+        self.changes.append((self.sequence, dn, info))
+        self.updated = time.time()
+    
+    def event(self, result):
+        """Record a new event; caller holds the lock"""
+        self.sequence += 1
+        self.changes.append((self.sequence, None, result))
+        self.updated = time.time()
+    
+    def updated_at(self):
+        return datetime.fromtimestamp(self.updated).isoformat()
+    
+    def snapshot(self):
+        """The full state at the current sequence; caller holds the lock"""
+        return {
+            'sequence': self.sequence,
+            'reset': True,
+            'registrations': dict(current_registrations),
+            'events': events_history[-EVENTS_SHOWN:],
+            'stats': stats_snapshot()
+        }
+    
+    def changes_since(self, since):
+        """The changes after sequence since, latest per DN; the full state when
+        since is unknown or older than the change log. Caller holds the lock."""
+        if since is None or since > self.sequence or (
+                since < self.sequence and (not self.changes or self.changes[0][0] > since + 1)):
+            return self.snapshot()
+        recent = []
+        for change in reversed(self.changes):
+            if change[0] <= since:
+                break
+            recent.append(change)
+        registrations = {}
+        events = []
+        for _, dn, change in reversed(recent):
+            if dn is None:
+                events.append(change)
+            else:
+                registrations[dn] = change
+        return {
+            'sequence': self.sequence,
+            'reset': False,
+            'registrations': registrations,
+            'events': events[-EVENTS_SHOWN:],
+            'stats': stats_snapshot()
+        }
+    
+    def subscribe(self):
+        """A new subscriber queue and the snapshot it starts from"""
+        subscriber = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+        with self.lock:
+            self.subscribers[subscriber] = self.sequence
+            return subscriber, self.snapshot()
+    
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.pop(subscriber, None)
+    
+    def is_subscribed(self, subscriber):
+        with self.lock:
+            return subscriber in self.subscribers
+    
+    def publish(self):
+        """Queue what each subscriber has not seen, serialized once per sequence"""
+        with self.lock:
+            behind = {}
+            for subscriber, sent in self.subscribers.items():
+                if sent != self.sequence:
+                    behind.setdefault(sent, []).append(subscriber)
+                    self.subscribers[subscriber] = self.sequence
+            changes = {sent: self.changes_since(sent) for sent in behind}
+        for sent, subscribers in behind.items():
+            message = sse_message('snapshot' if changes[sent]['reset'] else 'delta', changes[sent])
+            for subscriber in subscribers:
+                try:
+                    subscriber.put_nowait(message)
+                except queue.Full:
+                    self.unsubscribe(subscriber)
+
+updates = UpdateStream()
+
 def monitor_log_file():
     """Monitor log file for changes"""
-    global current_registrations, events_history, stats, last_parsed_line, current_log_file, monitor_status
+    global current_registrations, events_history, stats, log_handle, log_identity, carry, current_log_file, monitor_status
     
     print(f"[*] Starting log monitor - Watching: {LOG_PATH}")
     monitor_status['running'] = True
+    watcher = None
+    rescan = True  # look for the latest log: at start, when one is created, periodically
     
     while True:
         try:
@@ -131,9 +473,14 @@ def monitor_log_file():
                 monitor_status['error'] = f"Log directory not found: {LOG_PATH}"
                 time.sleep(10)
                 continue
+            if watcher is None:
+                watcher = LogWatcher(LOG_PATH)
             
             # Find latest log file
-            log_file = find_latest_log()
+            if rescan or not current_log_file or not os.path.exists(current_log_file):
+                log_file = find_latest_log()
+            else:
+                log_file = current_log_file
             
             if not log_file or not Path(log_file).exists():
                 monitor_status['error'] = f"No log files found matching: {LOG_PATTERN}"
@@ -143,67 +490,37 @@ def monitor_log_file():
             # Clear error if we got here
             monitor_status['error'] = None
             
-            # If log file changed, reset parsing
-            if log_file != current_log_file:
+            # A different file (not just a new name) is a rotation: finish the
+            # old log through its open handle before switching, so its tail is
+            # neither lost nor parsed again from the new one
+            if file_identity(log_file) != log_identity:
+                new_handle = open(log_file, 'rb')
+                if log_handle is None:
+                    backfill_rotated_logs(log_file)
+                else:
+                    carry = read_to_end(log_handle, carry)
+                    process_lines(carry.decode('utf-8', errors='ignore').splitlines(keepends=True))
+                    log_handle.close()
                 print(f"[*] Monitoring new log file: {log_file}")
-                current_log_file = log_file
-                last_parsed_line = 0
-            
-            # Read file
-            with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-            
-            # Parse new lines
-            i = last_parsed_line
-            while i < len(lines):
-                line = lines[i]
-                
-                # Look for REGISTER messages
-                if ('SIPTR: Received' in line or 'Sending' in line) and i + 1 < len(lines):
-                    if 'REGISTER' in lines[i+1] or 'SIP/2.0 200 OK' in lines[i+1]:
-                        result = parse_register_block(lines, i)
-                        
-                        if result['dn']:
-                            # Update stats
-                            stats['unique_dns'].add(result['dn'])
-                            
-                            if 'REGISTER' in lines[i+1]:
-                                stats['total_requests'] += 1
-                            
-                            if result['status'] == '200 OK':
-                                if result['expires'] and result['expires'] > 0:
-                                    stats['successful_registrations'] += 1
-                                    # Update current registrations
-                                    current_registrations[result['dn']] = {
-                                        'contact': result['contact'],
-                                        'expires': result['expires'],
-                                        'last_updated': result['timestamp'],
-                                        'source_ip': result['source_ip'],
-                                        'status': 'Registered'
-                                    }
-                                else:
-                                    stats['unregistrations'] += 1
-                                    # Remove from registrations
-                                    if result['dn'] in current_registrations:
-                                        del current_registrations[result['dn']]
-                            
-                            elif result['status'] and '200' not in result['status']:
-                                stats['failed_attempts'] += 1
-                            
-                            # Add to events history (keep last 100)
-                            events_history.append(result)
-                            if len(events_history) > 100:
-                                events_history.pop(0)
-                
-                i += 1
+                log_handle = new_handle
+                stat = os.fstat(log_handle.fileno())
+                log_identity = (stat.st_dev, stat.st_ino)
+                carry = b''
+            current_log_file = log_file
             
-            last_parsed_line = len(lines)
+            # Parse only the bytes appended since the last check
+            carry = read_to_end(log_handle, carry)
+            updates.publish()
             
         except Exception as e:
             monitor_status['error'] = f"Error monitoring log: {e}"
             print(f"[!] Error monitoring log: {e}")
         
-        time.sleep(2)  # Check every 2 seconds
+        # Sleep until the log is appended to or a new one appears
+        if watcher is not None:
+            rescan = watcher.wait(current_log_file, RESCAN_INTERVAL)
+        else:
+            time.sleep(POLL_INTERVAL)
 
 # Start monitoring thread
 monitor_thread = threading.Thread(target=monitor_log_file, daemon=True)
@@ -213,38 +530,79 @@ monitor_thread.start()
 @app.route('/')
 def index():
     """Serve the dashboard HTML"""
-    return render_template_string(HTML_TEMPLATE)
+    return render_template_string(HTML_TEMPLATE, events_shown=EVENTS_SHOWN)
+
+def versioned_response(build):
+    """JSON of build() with a strong ETag of the state sequence: a client
+    that already has this sequence gets 304 Not Modified, and no payload is built"""
+    with updates.lock:
+        etag = str(updates.sequence)
+        payload = None if request.if_none_match.contains(etag) else build()
+    response = Response(status=304) if payload is None else jsonify(payload)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/api/registrations')
 def get_registrations():
     """Get current registrations"""
-    return jsonify({
-        'registrations': current_registrations,
+    return versioned_response(lambda: {
+        'registrations': dict(current_registrations),
         'count': len(current_registrations),
-        'timestamp': datetime.now().isoformat()
+        'timestamp': updates.updated_at()
     })
 
 @app.route('/api/events')
 def get_events():
     """Get recent events"""
-    return jsonify({
-        'events': events_history[-50:],  # Last 50 events
+    return versioned_response(lambda: {
+        'events': events_history[-EVENTS_SHOWN:],
         'count': len(events_history),
-        'timestamp': datetime.now().isoformat()
+        'timestamp': updates.updated_at()
     })
 
-@app.route('/api/stats')
-def get_stats():
-    """Get statistics"""
-    return jsonify({
+def stats_snapshot():
+    """Current statistics, as served by /api/stats, /api/changes and /api/stream"""
+    return {
         'total_requests': stats['total_requests'],
         'successful_registrations': stats['successful_registrations'],
         'unregistrations': stats['unregistrations'],
         'failed_attempts': stats['failed_attempts'],
         'unique_dns': len(stats['unique_dns']),
-        'currently_registered': len(current_registrations),
-        'timestamp': datetime.now().isoformat()
-    })
+        'currently_registered': len(current_registrations)
+    }
+
+@app.route('/api/stats')
+def get_stats():
+    """Get statistics"""
+    return versioned_response(lambda: {**stats_snapshot(), 'timestamp': updates.updated_at()})
+
+@app.route('/api/changes')
+def get_changes():
+    """Changes after ?since=<sequence>; the full state (reset) without it or once it is too old"""
+    since = request.args.get('since', type=int)
+    return versioned_response(lambda: updates.changes_since(since))
+
+@app.route('/api/stream')
+def stream():
+    """Push updates as Server-Sent Events: a snapshot, then the deltas"""
+    subscriber, snapshot = updates.subscribe()
+    snapshot = sse_message('snapshot', snapshot)
+    
+    def generate():
+        try:
+            yield snapshot
+            # Dropped for falling behind: end the stream, the browser reconnects
+            while updates.is_subscribed(subscriber):
+                try:
+                    yield subscriber.get(timeout=STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+        finally:
+            updates.unsubscribe(subscriber)
+    
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/health')
 def health():
@@ -550,83 +908,132 @@ HTML_TEMPLATE = '''
             }
         }
         
-        // Fetch and update data
-        async function updateDashboard() {
-            try {
-                // Fetch stats
-                const statsRes = await fetch('/api/stats');
-                const stats = await statsRes.json();
-                
-                document.getElementById('stat-registered').textContent = stats.currently_registered;
-                document.getElementById('stat-requests').textContent = stats.total_requests;
-                document.getElementById('stat-success').textContent = stats.successful_registrations;
-                document.getElementById('stat-failed').textContent = stats.failed_attempts;
-                document.getElementById('stat-unique').textContent = stats.unique_dns;
-                
-                // Fetch registrations
-                const regRes = await fetch('/api/registrations');
-                const regData = await regRes.json();
-                
-                const tbody = document.getElementById('registrations-body');
-                if (Object.keys(regData.registrations).length === 0) {
-                    tbody.innerHTML = '<tr><td colspan="4" class="no-data">No registered endpoints</td></tr>';
-                } else {
-                    tbody.innerHTML = '';
-                    Object.entries(regData.registrations).forEach(([dn, info]) => {
-                        const row = tbody.insertRow();
-                        row.innerHTML = `
-                            <td><strong>${dn}</strong></td>
-                            <td>${info.contact || 'N/A'}</td>
-                            <td>${info.expires || 'N/A'}s</td>
-                            <td>${info.last_updated || 'N/A'}</td>
-                        `;
-                    });
-                }
-                
-                // Fetch events
-                const eventsRes = await fetch('/api/events');
-                const eventsData = await eventsRes.json();
-                
-                const eventsList = document.getElementById('events-list');
-                if (eventsData.events.length === 0) {
-                    eventsList.innerHTML = '<div class="no-data">No events yet</div>';
+        const EVENTS_SHOWN = {{ events_shown }};
+        // Page state: filled by the /api/stream snapshot and deltas, or by polling
+        let registrations = {};
+        let events = [];
+        let sequence = null;
+        
+        function renderStats(stats) {
+            document.getElementById('stat-registered').textContent = stats.currently_registered;
+            document.getElementById('stat-requests').textContent = stats.total_requests;
+            document.getElementById('stat-success').textContent = stats.successful_registrations;
+            document.getElementById('stat-failed').textContent = stats.failed_attempts;
+            document.getElementById('stat-unique').textContent = stats.unique_dns;
+        }
+        
+        function renderRegistrations() {
+            const tbody = document.getElementById('registrations-body');
+            if (Object.keys(registrations).length === 0) {
+                tbody.innerHTML = '<tr><td colspan="4" class="no-data">No registered endpoints</td></tr>';
+            } else {
+                tbody.innerHTML = '';
+                Object.entries(registrations).forEach(([dn, info]) => {
+                    const row = tbody.insertRow();
+                    row.innerHTML = `
+                        <td><strong>${dn}</strong></td>
+                        <td>${info.contact || 'N/A'}</td>
+                        <td>${info.expires || 'N/A'}s</td>
+                        <td>${info.last_updated || 'N/A'}</td>
+                    `;
+                });
+            }
+        }
+        
+        function renderEvents() {
+            const eventsList = document.getElementById('events-list');
+            if (events.length === 0) {
+                eventsList.innerHTML = '<div class="no-data">No events yet</div>';
+            } else {
+                eventsList.innerHTML = '';
+                events.slice().reverse().forEach(event => {
+                    const eventDiv = document.createElement('div');
+                    eventDiv.className = 'event-item';
+                    
+                    let statusBadge = '';
+                    if (event.status) {
+                        const statusClass = event.status === '200 OK' ? 'status-ok' : 'status-error';
+                        statusBadge = `<span class="status-badge ${statusClass}">${event.status}</span>`;
+                    }
+                    
+                    eventDiv.innerHTML = `
+                        <div class="event-time">${event.timestamp} - DN: ${event.dn}</div>
+                        <div class="event-details">
+                            ${statusBadge}
+                            Contact: ${event.contact || 'N/A'} | 
+                            Expires: ${event.expires !== null ? event.expires + 's' : 'N/A'} | 
+                            From: ${event.source_ip}
+                        </div>
+                    `;
+                    eventsList.appendChild(eventDiv);
+                });
+            }
+        }
+        
+        // Apply a snapshot (reset) or the changes since the last sequence
+        function applyChanges(changes) {
+            if (changes.reset) {
+                registrations = {};
+                events = [];
+            }
+            Object.entries(changes.registrations).forEach(([dn, info]) => {
+                if (info === null) {
+                    delete registrations[dn];
                 } else {
-                    eventsList.innerHTML = '';
-                    eventsData.events.reverse().forEach(event => {
-                        const eventDiv = document.createElement('div');
-                        eventDiv.className = 'event-item';
-                        
-                        let statusBadge = '';
-                        if (event.status) {
-                            const statusClass = event.status === '200 OK' ? 'status-ok' : 'status-error';
-                            statusBadge = `<span class="status-badge ${statusClass}">${event.status}</span>`;
-                        }
-                        
-                        eventDiv.innerHTML = `
-                            <div class="event-time">${event.timestamp} - DN: ${event.dn}</div>
-                            <div class="event-details">
-                                ${statusBadge}
-                                Contact: ${event.contact || 'N/A'} | 
-                                Expires: ${event.expires !== null ? event.expires + 's' : 'N/A'} | 
-                                From: ${event.source_ip}
-                            </div>
-                        `;
-                        eventsList.appendChild(eventDiv);
-                    });
+                    registrations[dn] = info;
                 }
-                
+            });
+            events = events.concat(changes.events).slice(-EVENTS_SHOWN);
+            sequence = changes.sequence;
+            
+            renderStats(changes.stats);
+            if (changes.reset || Object.keys(changes.registrations).length > 0) {
+                renderRegistrations();
+            }
+            if (changes.reset || changes.events.length > 0) {
+                renderEvents();
+            }
+        }
+        
+        // Fetch what changed since the last sequence (fallback when the stream
+        // is unavailable); the browser revalidates the ETag, 304 while idle
+        async function updateDashboard() {
+            try {
+                const res = await fetch(sequence === null ? '/api/changes' : `/api/changes?since=${sequence}`);
+                applyChanges(await res.json());
             } catch (error) {
                 console.error('Error fetching data:', error);
             }
         }
         
         // Update every 2 seconds
-        checkHealth();
-        updateDashboard();
-        setInterval(() => {
-            checkHealth();
+        function startPolling() {
             updateDashboard();
-        }, 2000);
+            setInterval(updateDashboard, 2000);
+        }
+        
+        // Live updates: a full snapshot on every (re)connect, then only what changed
+        function startStream() {
+            const source = new EventSource('/api/stream');
+            
+            source.addEventListener('snapshot', e => applyChanges(JSON.parse(e.data)));
+            source.addEventListener('delta', e => applyChanges(JSON.parse(e.data)));
+            
+            // EventSource reconnects by itself; CLOSED means the server refused the stream
+            source.onerror = () => {
+                if (source.readyState === EventSource.CLOSED) {
+                    startPolling();
+                }
+            };
+        }
+        
+        checkHealth();
+        setInterval(checkHealth, 2000);
+        if (window.EventSource) {
+            startStream();
+        } else {
+            startPolling();
+        }
     </script>
 </body>
 </html>
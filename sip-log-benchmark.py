@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+SIP Log Parser Benchmark
+Measures the throughput of sip-log-parser.py stages and of the dashboard's
+block parser on a SIP_P log (a real one or one from sip-log-generator.py)
+
+Usage: python sip-log-benchmark.py SIP_P-001.20260116_220242_332.log [--repeat N]
+       python sip-log-benchmark.py LOG --baseline bench.json [--threshold 10]
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+IN_MEMORY_LIMIT = 256 * 1024 * 1024  # larger logs only run the streaming stages
+LOWER_IS_BETTER = ('_rss_mb',)  # baseline metric suffixes where an increase is a regression
+
+def load_module(file_name, module_name):
+    """Import a script whose file name is not a valid module name"""
+    path = Path(__file__).with_name(file_name)
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+def load_parser_module():
+    """Import sip-log-parser.py"""
+    return load_module('sip-log-parser.py', 'sip_log_parser')
+
+def legacy_extract_headers(lines, start_idx):
+    """Header loop used before extract_headers() existed, kept as the baseline"""
+    dn = None
+    contact = None
+    expires = None
+    call_id = None
+    cseq = None
+    
+    idx = start_idx + 2
+    while idx < len(lines) and idx < start_idx + 20:
+        line = lines[idx].strip()
+        
+        if not line or line.startswith('22:') or line.startswith('23:'):
+            break
+        
+        if line.startswith('From:') or line.startswith('To:'):
+            dn_match = re.search(r'sip:(\w+)@', line)
+            if dn_match and not dn:
+                dn = dn_match.group(1)
+        
+        if line.startswith('Contact:'):
+            contact_match = re.search(r'<sip:(.+?)>', line)
+            if contact_match:
+                contact = contact_match.group(1)
+            expires_match = re.search(r'expires=(\d+)', line)
+            if expires_match:
+                expires = int(expires_match.group(1))
+        
+        if line.startswith('Expires:') and not expires:
+            expires_match = re.search(r'Expires:\s*(\d+)', line)
+            if expires_match:
+                expires = int(expires_match.group(1))
+        
+        if line.startswith('Call-ID:'):
+            call_id = line.split(':', 1)[1].strip()
+        
+        if line.startswith('CSeq:'):
+            cseq_match = re.search(r'(\d+)\s+REGISTER', line)
+            if cseq_match:
+                cseq = int(cseq_match.group(1))
+        
+        idx += 1
+    
+    return idx
+
+def legacy_prefilter(lines):
+    """Per-line substring tests of the old parse loop, kept as the baseline"""
+    candidates = 0
+    for line in lines:
+        if 'SIPTR: Received' in line:
+            candidates += 1
+        elif 'Sending' in line:
+            candidates += 1
+        elif 'SIP/2.0 401' in line or 'SIP/2.0 403' in line or 'SIP/2.0 4' in line:
+            candidates += 1
+    return candidates
+
+def collect_blocks(slp, lines):
+    """Return the message window of every REGISTER / 200 OK in the log"""
+    blocks = []
+    for i in range(len(lines) - 1):
+        if ('SIPTR: Received' in lines[i] and 'REGISTER' in lines[i + 1]) or \
+           ('Sending' in lines[i] and 'SIP/2.0 200 OK' in lines[i + 1]):
+            blocks.append(lines[i:i + slp.MESSAGE_WINDOW])
+    return blocks
+
+def best_time(func, repeat):
+    """Best wall-clock time of func() over repeat runs"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def bench_prefilter(slp, lines, repeat):
+    """Line classification: legacy substring tests vs the scanner's prefilter"""
+    prefilter = slp.PATTERNS[str].prefilter.search
+    classify_line = slp.classify_line
+    before = best_time(lambda: legacy_prefilter(lines), repeat)
+    after = best_time(lambda: [classify_line(line) for line in lines if prefilter(line)], repeat)
+    return before, after
+
+def bench_headers(slp, lines, repeat):
+    """Header extraction: legacy per-line regex loop vs extract_headers()"""
+    blocks = collect_blocks(slp, lines)
+    header_lines = sum(slp.extract_headers(block, 0).end - 2 for block in blocks)
+    
+    before = best_time(lambda: [legacy_extract_headers(block, 0) for block in blocks], repeat)
+    after = best_time(lambda: [slp.extract_headers(block, 0) for block in blocks], repeat)
+    return header_lines, before, after
+
+def bench_parse(slp, log_file, repeat, bytes_mode=False):
+    """Full SIPLogParser.parse() of the log"""
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            slp.SIPLogParser(log_file, bytes_mode=bytes_mode).parse()
+    return best_time(run, repeat)
+
+def value_size(value):
+    """Bytes of one field value; None and small ints are shared singletons"""
+    if value is None or (isinstance(value, int) and -5 <= value <= 256):
+        return 0
+    return sys.getsizeof(value)
+
+def bench_event_memory(slp, log_file):
+    """Bytes per event: one dict per event with private strings vs slotted, interned records"""
+    parser = slp.SIPLogParser(log_file)
+    with contextlib.redirect_stdout(io.StringIO()):
+        parser.parse()
+    events = parser.events
+    
+    # Before: every regex group produced its own string for every event
+    before = 0
+    for event in events:
+        event_dict = event.as_dict()
+        before += sys.getsizeof(event_dict)
+        before += sum(value_size(value) for key, value in event_dict.items() if key != 'type')
+    
+    # After: the record plus every distinct value once
+    after = 0
+    seen = set()
+    for event in events:
+        after += sys.getsizeof(event)
+        for name in event.__slots__:
+            value = getattr(event, name)
+            if name != 'type' and id(value) not in seen:
+                seen.add(id(value))
+                after += value_size(value)
+    
+    return len(events), before / max(len(events), 1), after / max(len(events), 1)
+
+def count_lines(log_path):
+    """Line count of a log without holding it in memory"""
+    with open(log_path, 'rb') as f:
+        return sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1024 * 1024), b''))
+
+def run_child(command, cwd):
+    """Run a benchmark child process, return (wall seconds, peak RSS in MB or None)
+    
+    The peak RSS comes from os.wait4 and is the child's own; it is not
+    available on Windows.
+    """
+    start = time.perf_counter()
+    proc = subprocess.Popen(command, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output = proc.stdout.read()
+    rss_mb = None
+    if hasattr(os, 'wait4'):
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        # ru_maxrss is in KB on Linux, in bytes on macOS
+        rss_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    else:
+        proc.wait()
+    elapsed = time.perf_counter() - start
+    
+    if proc.returncode:
+        print(f"[-] Error: {' '.join(map(str, command))} failed:")
+        print(output.decode('utf-8', errors='ignore')[-2000:])
+        sys.exit(1)
+    return elapsed, rss_mb, output
+
+def bench_cli(log_path, repeat):
+    """sip-log-parser.py as a user runs it, including its JSON export"""
+    parser_path = Path(__file__).with_name('sip-log-parser.py')
+    best, peak = None, None
+    with tempfile.TemporaryDirectory() as cwd:
+        for _ in range(repeat):
+            elapsed, rss_mb, _ = run_child([sys.executable, str(parser_path), str(log_path.resolve())], cwd)
+            best = elapsed if best is None else min(best, elapsed)
+            peak = rss_mb if peak is None else max(peak, rss_mb)
+    return best, peak
+
+def bench_dashboard(log_path, repeat):
+    """The dashboard's readlines() + process_lines() pass over the log, in a child
+    
+    Returns (seconds, peak RSS in MB), or None when Flask is not installed.
+    """
+    best, peak = None, None
+    # An empty working directory keeps the dashboard's monitor thread idle
+    with tempfile.TemporaryDirectory() as cwd:
+        for _ in range(repeat):
+            _, rss_mb, output = run_child([sys.executable, str(Path(__file__).resolve()),
+                                           '--dashboard-child', str(log_path.resolve())], cwd)
+            result = output.decode('utf-8', errors='ignore').split()
+            if not result or result[-1] == 'skipped':
+                return None
+            elapsed = float(result[-1])
+            best = elapsed if best is None else min(best, elapsed)
+            peak = rss_mb if peak is None else max(peak, rss_mb)
+    return best, peak
+
+def dashboard_child(log_file):
+    """Body of the --dashboard-child process: print the parse time in seconds"""
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            dashboard = load_module('sip-dashboard.py', 'sip_dashboard')
+    except ImportError:
+        print("skipped")
+        return
+    
+    start = time.perf_counter()
+    with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
+        lines = f.readlines()
+    dashboard.process_lines(lines)
+    print(f"{time.perf_counter() - start:.6f}")
+
+def check_baseline(results, baseline_file, threshold, log_path):
+    """Compare results with a saved baseline, save one if there is none
+    
+    Returns the number of metrics that regressed by more than threshold
+    percent: throughputs that dropped, peak RSS values that grew.
+    """
+    baseline_path = Path(baseline_file)
+    if not baseline_path.exists():
+        with open(baseline_path, 'w') as f:
+            json.dump({'log_file': str(log_path), 'size': log_path.stat().st_size,
+                       'results': results}, f, indent=2)
+        print(f"\n[+] Baseline saved to: {baseline_path}")
+        return 0
+    
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    if baseline['size'] != log_path.stat().st_size:
+        print(f"[!] Baseline was taken on a different log ({baseline['log_file']})")
+    
+    print(f"\n[*] Baseline: {baseline_path} (threshold {threshold:g}%)")
+    print("-" * 80)
+    print(f"{'Metric':<24} {'Baseline':>14} {'Now':>14} {'Change':>10}")
+    print("-" * 80)
+    regressions = 0
+    for name, before in baseline['results'].items():
+        after = results.get(name)
+        if after is None or not before:
+            continue
+        change = (after - before) / before * 100
+        worse = change > threshold if name.endswith(LOWER_IS_BETTER) else change < -threshold
+        regressions += worse
+        print(f"{name:<24} {before:>14,.1f} {after:>14,.1f} {change:>+9.1f}%"
+              f"{'  [-] REGRESSION' if worse else ''}")
+    return regressions
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == '--dashboard-child':
+        dashboard_child(sys.argv[2])
+        return
+    
+    arg_parser = argparse.ArgumentParser(description='Benchmark sip-log-parser.py')
+    arg_parser.add_argument('log_file', help='SIP_P log to benchmark on')
+    arg_parser.add_argument('--repeat', type=int, default=3, metavar='N',
+                            help='runs per stage, best time is reported (default: 3)')
+    arg_parser.add_argument('--baseline', metavar='FILE',
+                            help='compare with the results in FILE (saved there if missing) and '
+                                 'exit with status 1 on a regression')
+    arg_parser.add_argument('--threshold', type=float, default=10, metavar='PCT',
+                            help='slowdown / RSS growth in percent counted as a regression '
+                                 '(default: 10)')
+    args = arg_parser.parse_args()
+    
+    log_path = Path(args.log_file)
+    size = log_path.stat().st_size
+    size_mb = size / (1024 * 1024)
+    in_memory = size <= IN_MEMORY_LIMIT
+    
+    # Whole programs first, in a child process each: on Linux a forked child
+    # starts with the parent's peak RSS, so the log must not be loaded yet
+    programs = [('cli', bench_cli(log_path, args.repeat))]
+    if in_memory:
+        programs.append(('dashboard', bench_dashboard(log_path, args.repeat)))
+    
+    slp = load_parser_module()
+    if in_memory:
+        with open(log_path, 'r', encoding='utf-8', errors='ignore') as f:
+            lines = f.readlines()
+        line_count = len(lines)
+    else:
+        line_count = count_lines(log_path)
+    results = {}
+    
+    print(f"\n[*] Benchmark: {log_path} ({size_mb:.2f} MB, {line_count:,} lines, best of {args.repeat})")
+    print("-" * 80)
+    print(f"{'Stage':<24} {'Items':>12} {'Before':>14} {'After':>14} {'Gain':>10}")
+    print("-" * 80)
+    
+    if in_memory:
+        before, after = bench_prefilter(slp, lines, args.repeat)
+        print(f"{'prefilter (lines/s)':<24} {line_count:>12,} {line_count / before:>14,.0f} "
+              f"{line_count / after:>14,.0f} {before / after:>9.2f}x")
+        results['prefilter_lines_s'] = line_count / after
+        
+        header_lines, before, after = bench_headers(slp, lines, args.repeat)
+        print(f"{'headers (lines/s)':<24} {header_lines:>12,} {header_lines / before:>14,.0f} "
+              f"{header_lines / after:>14,.0f} {before / after:>9.2f}x")
+        results['headers_lines_s'] = header_lines / after
+        del lines
+    else:
+        print(f"[!] Log larger than {IN_MEMORY_LIMIT // (1024 * 1024)} MB - in-memory stages skipped")
+    
+    elapsed = bench_parse(slp, log_path, args.repeat)
+    print(f"{'parse (lines/s)':<24} {line_count:>12,} {'':>14} {line_count / elapsed:>14,.0f} "
+          f"{'':>10}  ({size_mb / elapsed:.1f} MB/s)")
+    results['parse_lines_s'] = line_count / elapsed
+    
+    bytes_elapsed = bench_parse(slp, log_path, args.repeat, bytes_mode=True)
+    print(f"{'parse str->bytes (l/s)':<24} {line_count:>12,} {line_count / elapsed:>14,.0f} "
+          f"{line_count / bytes_elapsed:>14,.0f} {elapsed / bytes_elapsed:>9.2f}x"
+          f"  ({size_mb / bytes_elapsed:.1f} MB/s)")
+    results['parse_bytes_lines_s'] = line_count / bytes_elapsed
+    
+    if in_memory:
+        event_count, before, after = bench_event_memory(slp, log_path)
+        print(f"{'event memory (B/event)':<24} {event_count:>12,} {before:>14,.0f} "
+              f"{after:>14,.0f} {before / after:>9.2f}x")
+    
+    print("-" * 80)
+    print(f"{'Program':<24} {'Lines/s':>12} {'MB/s':>14} {'Peak RSS':>14}")
+    print("-" * 80)
+    for name, result in programs:
+        if result is None:
+            print(f"[!] Flask not installed - {name} stage skipped")
+            continue
+        elapsed, rss_mb = result
+        rss = f"{rss_mb:,.1f} MB" if rss_mb is not None else 'n/a'
+        print(f"{name + ' (lines/s)':<24} {line_count / elapsed:>12,.0f} {size_mb / elapsed:>14,.1f} "
+              f"{rss:>14}")
+        results[f'{name}_lines_s'] = line_count / elapsed
+        results[f'{name}_mb_s'] = size_mb / elapsed
+        if rss_mb is not None:
+            results[f'{name}_rss_mb'] = rss_mb
+    
+    if args.baseline:
+        regressions = check_baseline(results, args.baseline, args.threshold, log_path)
+        if regressions:
+            print(f"\n[-] {regressions} metric(s) regressed by more than {args.threshold:g}%")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Synthetic Genesys SIP Server Log Generator
+Writes SIP_P logs with REGISTER / 401 / 200 OK / unregister traffic for benchmarks
+
+Usage: python sip-log-generator.py [--size 100MB] [--dns 500] [--rate 600] [--seed 1]
+"""
+
+import argparse
+import random
+import re
+import sys
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+DAY_MS = 24 * 60 * 60 * 1000
+WRITE_BUFFER_SIZE = 1024 * 1024  # bytes written to disk per chunk
+SIZE_RE = re.compile(r'(\d+(?:\.\d+)?)\s*([KMG]?)B?$', re.IGNORECASE)
+SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+SERVER_IP = '192.168.210.81'
+FAILURES = ('403 Forbidden', '404 Not Found', '408 Request Timeout')
+
+# SIP Server housekeeping lines written between messages, as in a real SIP_P log
+NOISE_LINES = (
+    '$+NET:SIP::0:0',
+    'TRNMNGR: internal domain 192.168.210.81',
+    'SIPTS: handle registration event 0',
+    '$*:SIP:CTI:DN_CONTACT_CHANGE:{n}',
+    '$+CTI:PRM:SET_AGENT_STATE:{n}:90',
+    '$-CTI:PRM:SET_AGENT_STATE:{n}:38',
+    '$+CTI:PRM:QUERY_MWI_INFO:{n}:72',
+    '$-CTI:PRM:QUERY_MWI_INFO:{n}:18',
+    'SIPCM: transaction SipScenario(0) complete',
+    'CALLSTATE(a:2,d:0,i:0,e:0,r:0,o:0)',
+    'SUBSCRIBE request is rejected or timed out ',
+    '$-NET:SIP::0:{n}',
+)
+
+def size_arg(value):
+    """'10MB', '5GB', '512K' or a byte count -> bytes"""
+    size_match = SIZE_RE.match(value.strip())
+    if not size_match:
+        raise argparse.ArgumentTypeError(f"invalid size: {value!r} (e.g. 10MB, 5GB)")
+    return int(float(size_match.group(1)) * SIZE_UNITS[size_match.group(2).upper()])
+
+def start_arg(value):
+    """'YYYY-MM-DD HH:MM:SS' -> datetime"""
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid start time: {value!r} (YYYY-MM-DD HH:MM:SS)")
+
+def format_time(ms):
+    """HH:MM:SS.mmm of a millisecond clock; only the time of day is logged"""
+    seconds, millis = divmod(ms % DAY_MS, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{millis:03d}"
+
+def log_header(start):
+    """File header SIP Server writes when it opens a log"""
+    name = f"SIP_P-001.{start:%Y%m%d_%H%M%S}_{start.microsecond // 1000:03d}.log"
+    return (
+        "Application name: SIP_P\n"
+        "Application type: TServer (1)\n"
+        "Command line:     D:\\gcti_apps\\SIP_P\\sip_server.exe -host GenUAT02 -port 2020 -app SIP_P\n"
+        "Host name:        GenUAT02\n"
+        f"Local time:       {start:%Y-%m-%dT%H:%M:%S}.{start.microsecond // 1000:03d}\n"
+        f"File:             (1) D:\\gcti_logs\\SIP_P\\{name}\n"
+        "\n"
+    )
+
+def random_uuid():
+    """A version 4 UUID drawn from random, so that --seed reproduces it"""
+    return uuid.UUID(int=random.getrandbits(128), version=4)
+
+class Endpoint:
+    """A registering DN with its own address, Call-ID and CSeq"""
+    __slots__ = ('dn', 'ip', 'port', 'call_id', 'cseq', 'tag', 'registered')
+    
+    def __init__(self, dn, ip, port):
+        self.dn = dn
+        self.ip = ip
+        self.port = port
+        self.call_id = str(random_uuid())
+        self.cseq = random.randint(1, 60000)
+        self.tag = str(random_uuid())
+        self.registered = False
+
+class LogGenerator:
+    """Turn a stream of REGISTER transactions into SIP_P log text"""
+    def __init__(self, dns=100, rate=60, failure_ratio=0.05, challenge_ratio=0.3,
+                 unregister_ratio=0.05, noise=20, start=None):
+        self.endpoints = [Endpoint(str(5000 + n), f"10.{n // 65536 % 256}.{n // 256 % 256}.{n % 256}",
+                                   random.choice((5060, 5061, 5090)))
+                          for n in range(dns)]
+        self.mean_gap_ms = 60000 / rate  # registrations per minute -> mean gap
+        self.failure_ratio = failure_ratio
+        self.challenge_ratio = challenge_ratio
+        self.unregister_ratio = unregister_ratio
+        self.noise = noise
+        self.start = start or datetime.now()
+        self.start_ms = (self.start.hour * 3600 + self.start.minute * 60 + self.start.second) * 1000
+        self.clock = self.start_ms  # ms since the start day's midnight
+        self.counter = 0  # sequence number in the $+/$- noise lines
+    
+    def noise_lines(self, parts, count):
+        for _ in range(count):
+            self.counter += 1
+            line = random.choice(NOISE_LINES).format(n=self.counter)
+            parts.append(f"{format_time(self.clock)}: {line}\n")
+    
+    def request(self, parts, endpoint, expires, auth=False):
+        """SIPTR: Received REGISTER from the endpoint"""
+        endpoint.cseq += 1
+        auth_line = (f'Authorization: Digest username="{endpoint.dn}", realm="{SERVER_IP}", '
+                     f'nonce="{random_uuid().hex}", uri="sip:{SERVER_IP}", response="{random_uuid().hex}"\n'
+                     if auth else '')
+        parts.append(
+            f"{format_time(self.clock)}: SIPTR: Received [0,UDP] 557 bytes from "
+            f"{endpoint.ip}:{endpoint.port} <<<<<\n"
+            f"REGISTER sip:{SERVER_IP} SIP/2.0\n"
+            f"Via: SIP/2.0/UDP {endpoint.ip}:{endpoint.port};rport;branch=z9hG4bKPj{random_uuid()}\n"
+            f"From: <sip:{endpoint.dn}@{SERVER_IP}>;tag={endpoint.tag}\n"
+            f"To: <sip:{endpoint.dn}@{SERVER_IP}>\n"
+            f"Call-ID: {endpoint.call_id}\n"
+            f"CSeq: {endpoint.cseq} REGISTER\n"
+            f"Contact: <sip:{endpoint.dn}@{endpoint.ip}:{endpoint.port}>\n"
+            f"Expires: {expires}\n"
+            f"{auth_line}"
+            "Max-Forwards: 70\n"
+            "User-Agent: Asterisk-WebRTC-Client\n"
+            "Content-Length:  0\n"
+            "\n\n"
+        )
+    
+    def response(self, parts, endpoint, status, expires):
+        """Sending the REGISTER response to the endpoint"""
+        contact = f"Contact: <sip:{endpoint.dn}@{endpoint.ip}:{endpoint.port}>;expires={expires}\n"
+        if status.startswith('401'):
+            contact = (f'WWW-Authenticate: Digest realm="{SERVER_IP}", nonce="{random_uuid().hex}", '
+                       'algorithm=MD5\n')
+        parts.append(
+            f"{format_time(self.clock)}: Sending  [0,UDP] 444 bytes to "
+            f"{endpoint.ip}:{endpoint.port} >>>>>\n"
+            f"SIP/2.0 {status}\n"
+            f"Via: SIP/2.0/UDP {endpoint.ip}:{endpoint.port};rport;received={endpoint.ip}\n"
+            f"From: <sip:{endpoint.dn}@{SERVER_IP}>;tag={endpoint.tag}\n"
+            f"To: <sip:{endpoint.dn}@{SERVER_IP}>;tag={random_uuid()}\n"
+            f"Call-ID: {endpoint.call_id}\n"
+            f"CSeq: {endpoint.cseq} REGISTER\n"
+            f"{contact}"
+            "Content-Length: 0\n"
+            "\n\n"
+        )
+    
+    def transaction(self):
+        """Log text of one REGISTER transaction and the noise around it"""
+        parts = []
+        self.clock += max(1, int(random.expovariate(1 / self.mean_gap_ms)))
+        endpoint = random.choice(self.endpoints)
+        unregister = endpoint.registered and random.random() < self.unregister_ratio
+        expires = 0 if unregister else random.choice((600, 1800, 3600))
+        
+        self.noise_lines(parts, self.noise // 2)
+        self.request(parts, endpoint, expires)
+        if random.random() < self.challenge_ratio:
+            self.clock += random.randint(1, 5)
+            self.response(parts, endpoint, '401 Unauthorized', expires)
+            self.clock += random.randint(20, 400)
+            self.request(parts, endpoint, expires, auth=True)
+        self.noise_lines(parts, self.noise - self.noise // 2)
+        self.clock += random.randint(1, 5)
+        
+        if random.random() < self.failure_ratio:
+            self.response(parts, endpoint, random.choice(FAILURES), expires)
+        else:
+            self.response(parts, endpoint, '200 OK', expires)
+            endpoint.registered = expires > 0
+        return ''.join(parts)
+    
+    def write(self, output_file, size):
+        """Write transactions until the log reaches size bytes, return the count"""
+        count = 0
+        written = 0
+        with open(output_file, 'w', encoding='utf-8', newline='\n',
+                  buffering=WRITE_BUFFER_SIZE) as f:
+            header = log_header(self.start)
+            f.write(header)
+            written += len(header)
+            while written < size:
+                text = self.transaction()
+                f.write(text)
+                written += len(text)
+                count += 1
+        return count
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Generate a synthetic SIP_P log')
+    arg_parser.add_argument('output', nargs='?',
+                            help='log file to write (default: SIP_P-001.<start>.log)')
+    arg_parser.add_argument('--size', type=size_arg, default=size_arg('10MB'), metavar='SIZE',
+                            help='approximate file size, e.g. 10MB, 500MB, 5GB (default: 10MB)')
+    arg_parser.add_argument('--dns', type=int, default=100, metavar='N',
+                            help='registering DNs (default: 100)')
+    arg_parser.add_argument('--rate', type=float, default=60, metavar='N',
+                            help='REGISTER transactions per minute of log time (default: 60)')
+    arg_parser.add_argument('--failure-ratio', type=float, default=0.05, metavar='R',
+                            help='share of transactions answered with a 4xx (default: 0.05)')
+    arg_parser.add_argument('--challenge-ratio', type=float, default=0.3, metavar='R',
+                            help='share of transactions challenged with a 401 first (default: 0.3)')
+    arg_parser.add_argument('--unregister-ratio', type=float, default=0.05, metavar='R',
+                            help='share of registered DNs sending Expires: 0 (default: 0.05)')
+    arg_parser.add_argument('--noise', type=int, default=20, metavar='N',
+                            help='housekeeping lines per transaction (default: 20)')
+    arg_parser.add_argument('--start', type=start_arg, metavar='TIME',
+                            help="log start 'YYYY-MM-DD HH:MM:SS' (default: now)")
+    arg_parser.add_argument('--seed', type=int,
+                            help='random seed for a reproducible log (with a fixed --start)')
+    args = arg_parser.parse_args()
+    
+    if args.dns < 1 or args.rate <= 0:
+        print("[-] Error: --dns and --rate must be positive")
+        sys.exit(1)
+    
+    random.seed(args.seed)
+    start = (args.start or datetime.now()).replace(microsecond=0)
+    output = args.output or f"SIP_P-001.{start:%Y%m%d_%H%M%S}_000.log"
+    generator = LogGenerator(dns=args.dns, rate=args.rate, failure_ratio=args.failure_ratio,
+                             challenge_ratio=args.challenge_ratio,
+                             unregister_ratio=args.unregister_ratio, noise=args.noise, start=start)
+    
+    print(f"[*] Writing {args.size / (1024*1024):.1f} MB to: {output}")
+    count = generator.write(output, args.size)
+    end = start + timedelta(milliseconds=generator.clock - generator.start_ms)
+    print(f"[+] {count:,} REGISTER transactions, {args.dns:,} DNs, "
+          f"{start:%Y-%m-%d %H:%M:%S} - {end:%Y-%m-%d %H:%M:%S}")
+    print(f"File size: {Path(output).stat().st_size / (1024*1024):.2f} MB")
+
+if __name__ == '__main__':
+    main()
@@ -2,230 +2,775 @@
 """
 Genesys SIP Server Log Parser
 Extracts and analyzes REGISTER messages and endpoint registrations
+
+The log is streamed rather than loaded: peak memory is bounded by one read
+buffer plus one message window (see SIPLogParser.parse), not by the file size.
 """
 
+import argparse
+import base64
+import bz2
+import calendar
+import contextlib
+import gzip
+import hashlib
+import heapq
+import io
+import json
+import lzma
+import math
+import os
 import re
+import sqlite3
 import sys
-from datetime import datetime
-from collections import defaultdict
+import time
+from datetime import date, datetime, timezone
+from collections import Counter, defaultdict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import chain, islice
+from operator import attrgetter, itemgetter
 from pathlib import Path
 import glob
 
+# Streaming reader settings
+STREAM_BUFFER_SIZE = 1024 * 1024  # bytes read from disk per chunk
+MESSAGE_WINDOW = 20  # lines a message handler may look at (start line + headers)
+
+# Header names we extract, including the compact forms (RFC 3261 7.3.3)
+HEADER_NAMES = {
+    'from': 'from', 'f': 'from',
+    'to': 'to', 't': 'to',
+    'contact': 'contact', 'm': 'contact',
+    'call-id': 'call-id', 'i': 'call-id',
+    'expires': 'expires',
+    'cseq': 'cseq'
+}
+
+# SIP_P-001.20260116_220242_332.log -> date/time the log was opened
+LOG_NAME_RE = re.compile(r'\.(\d{8})_(\d{6})_(\d{3})\.log')
+COMPRESSED_SUFFIXES = ('.gz', '.bz2', '.xz', '.zst')  # archived rotations
+TIME_OF_DAY_RE = re.compile(r'(\d{2}):(\d{2}):(\d{2})\.(\d{3})$')
+MINUTE_MS = 60 * 1000
+DAY_MS = 24 * 60 * MINUTE_MS
+ROLLOVER_MS = DAY_MS // 2  # a backward jump of the log clock beyond this is midnight
+LOG_START_SLACK_MS = 60 * 60 * 1000  # lines up to this long before the file name time share its day
+TRANSACTION_TIMEOUT_MS = 32 * 1000  # non-INVITE transaction timeout (64 * T1)
+HISTOGRAM_SUB_BITS = 7  # latency histogram precision: 2**7 sub-buckets per power of two
+ANALYTICS_CAPACITY = 256  # items a space-saving top-N sketch keeps
+HLL_PRECISION = 12  # HyperLogLog registers: 2**12 (4 KB, ~1.6% standard error)
+INDEX_SUFFIX = '.idx'  # sidecar index database: <log_file>.idx (see LogIndex)
+INDEX_KEYS = ('dn', 'call_id', 'ip')  # event fields the index maps to message blocks
+SQLITE_BATCH_SIZE = 50000  # events inserted per SQLite transaction
+TIME_ARG_RE = re.compile(r'(\d{1,2}):(\d{2})(?::(\d{2})(?:\.(\d{1,3}))?)?$')  # --since/--until
+
+# Prefilter classes: one scan per line tells a message start, a 4xx status
+# line and noise apart, so the handlers only ever see candidate lines
+MESSAGE_START = 'message-start'
+FAILURE_STATUS = 'failure-status'
+SKIP = 'skip'
+
+EVENT_TYPES = ('REGISTER_REQUEST', '200_OK', 'UNREGISTER_OK')
+RATE_COLUMNS = EVENT_TYPES + ('FAILED',)  # per-minute bucket layout
+
+class SIPPatterns:
+    """Precompiled patterns and tokens for str lines or raw bytes lines
+    
+    The bytes set lets the parser scan undecoded log data; only the values it
+    extracts (DN, contact, Call-ID, ...) are decoded.
+    """
+    def __init__(self, kind):
+        def token(text):
+            return text if kind is str else text.encode('ascii')
+        
+        def compile_(pattern):
+            return re.compile(token(pattern))
+        
+        self.timestamp = compile_(r'(\d{2}:\d{2}:\d{2}\.\d{3})')
+        self.timestamped_line = compile_(r'\d{2}:\d{2}:\d{2}\.\d{3}')
+        self.source = compile_(r'from ([\d\.]+):(\d+)')
+        self.dest = compile_(r'to ([\d\.]+):(\d+)')
+        self.status = compile_(r'SIP/2.0 (\d+) (.+)')
+        self.dn = compile_(r'sip:(\w+)@')
+        self.contact = compile_(r'<sip:(.+?)>')
+        self.contact_expires = compile_(r'expires=(\d+)')
+        self.expires = compile_(r'\s*(\d+)')
+        self.cseq = compile_(r'(\d+)\s+REGISTER')
+        self.prefilter = compile_(r'SIPTR: Received|Sending|SIP/2\.0 4')
+        
+        self.received = token('SIPTR: Received')
+        self.sending = token('Sending')
+        self.register = token('REGISTER')
+        self.ok = token('SIP/2.0 200 OK')
+        self.failure = token('SIP/2.0 4')
+        self.colon = token(':')
+        self.header_names = {token(name): header for name, header in HEADER_NAMES.items()}
+        
+        if kind is str:
+            self.decode = str
+        else:
+            self.decode = lambda value: value.decode('utf-8', errors='ignore')
+
+PATTERNS = {str: SIPPatterns(str), bytes: SIPPatterns(bytes)}
+
+def classify_line(line):
+    """Classify a str or bytes log line as MESSAGE_START, FAILURE_STATUS or SKIP"""
+    p = PATTERNS[type(line)]
+    match = p.prefilter.search(line)
+    if match is None:
+        return SKIP
+    if match.group() != p.failure:
+        return MESSAGE_START
+    # A start token after the status text still makes it a message start
+    if p.prefilter.search(line, match.end()) is None:
+        return FAILURE_STATUS
+    return MESSAGE_START
+
+# Header values of one SIP message; end is the index of the first line after the block
+HeaderRecord = namedtuple('HeaderRecord', 'dn contact contact_expires expires call_id cseq end')
+
+def extract_headers(lines, start_idx):
+    """Extract the registration headers of the message starting at lines[start_idx]
+    
+    lines[start_idx] is the SIPTR start line and lines[start_idx + 1] the
+    request/status line; the header block ends at the first blank line.
+    Each header line is dispatched once on its (lower-cased) name. Lines may
+    be str or bytes; the returned values are always str/int.
+    """
+    p = PATTERNS[type(lines[start_idx + 1])]
+    dn = contact = contact_expires = expires = call_id = cseq = None
+    
+    idx = start_idx + 2
+    end = min(len(lines), start_idx + MESSAGE_WINDOW)
+    while idx < end:
+        line = lines[idx].strip()
+        
+        if not line or p.timestamped_line.match(line):
+            break
+        
+        name, _, value = line.partition(p.colon)
+        header = p.header_names.get(name.rstrip().lower())
+        
+        if header == 'from' or header == 'to':
+            # DN comes from the first From/To header with a SIP user
+            if dn is None:
+                dn_match = p.dn.search(value)
+                if dn_match:
+                    dn = p.decode(dn_match.group(1))
+        
+        elif header == 'contact':
+            contact_match = p.contact.search(value)
+            if contact_match:
+                contact = p.decode(contact_match.group(1))
+            expires_match = p.contact_expires.search(value)
+            if expires_match:
+                contact_expires = int(expires_match.group(1))
+        
+        elif header == 'expires':
+            expires_match = p.expires.match(value)
+            if expires_match:
+                expires = int(expires_match.group(1))
+        
+        elif header == 'call-id':
+            call_id = p.decode(value.strip())
+        
+        elif header == 'cseq':
+            cseq_match = p.cseq.search(value)
+            if cseq_match:
+                cseq = int(cseq_match.group(1))
+        
+        idx += 1
+    
+    return HeaderRecord(dn, contact, contact_expires, expires, call_id, cseq, idx)
+
+class SymbolTable:
+    """Interns repeated strings so that every event refers to one shared copy"""
+    __slots__ = ('symbols',)
+    
+    def __init__(self):
+        self.symbols = {}
+    
+    def intern(self, value):
+        if value is None:
+            return None
+        return self.symbols.setdefault(value, value)
+
+class RegistrationEvent:
+    """A REGISTER request or its 200 OK / unregister response
+    
+    ip/port hold the source address of a REGISTER_REQUEST and the destination
+    address of a response; as_dict() restores the exported key names. ts is
+    the timestamp in epoch milliseconds (see LogClock).
+    """
+    __slots__ = ('timestamp', 'ts', 'type', 'dn', 'ip', 'port', 'contact', 'expires', 'call_id',
+                 'cseq')
+    
+    def __init__(self, timestamp, ts, type, dn, ip, port, contact, expires, call_id, cseq):
+        self.timestamp = timestamp
+        self.ts = ts
+        self.type = type
+        self.dn = dn
+        self.ip = ip
+        self.port = port
+        self.contact = contact
+        self.expires = expires
+        self.call_id = call_id
+        self.cseq = cseq
+    
+    def intern(self, symbols):
+        """Replace the repetitive string fields with their shared copies
+        
+        Call-IDs and contacts are close to unique per event, interning them
+        would only grow the table.
+        """
+        intern = symbols.intern
+        self.dn = intern(self.dn)
+        self.ip = intern(self.ip)
+        self.port = intern(self.port)
+    
+    def as_dict(self):
+        """The event in its JSON export shape"""
+        if self.type == 'REGISTER_REQUEST':
+            return {
+                'timestamp': self.timestamp,
+                'ts': self.ts,
+                'type': self.type,
+                'dn': self.dn,
+                'source_ip': self.ip,
+                'source_port': self.port,
+                'contact': self.contact,
+                'expires': self.expires,
+                'call_id': self.call_id,
+                'cseq': self.cseq
+            }
+        return {
+            'timestamp': self.timestamp,
+            'ts': self.ts,
+            'type': self.type,
+            'dn': self.dn,
+            'contact': self.contact,
+            'expires': self.expires,
+            'dest_ip': self.ip,
+            'dest_port': self.port,
+            'call_id': self.call_id,
+            'cseq': self.cseq
+        }
+
 class SIPLogParser:
-    def __init__(self, log_file):
+    def __init__(self, log_file, bytes_mode=False, max_events=None, listeners=(),
+                 since=None, until=None, dns=None, track_latency=False, analytics=None):
         self.log_file = log_file
+        self.bytes_mode = bytes_mode  # scan raw bytes, decode extracted values only
+        self.patterns = PATTERNS[bytes if bytes_mode else str]
         self.registrations = {}  # DN -> registration info
-        self.events = []  # Timeline of events
-        self.failed_registrations = []
+        # Timeline of events; with max_events only the most recent ones are kept
+        self.events = deque(maxlen=max_events) if max_events else []
+        self.failed_registrations = deque(maxlen=max_events) if max_events else []
+        self.listeners = list(listeners)  # called with every recorded event
+        # Top-N / distinct counts: fixed-size sketches ('sketch') or exact ('exact'),
+        # otherwise the per-DN / per-IP aggregates the summary lists
+        self.analytics = RegistrationAnalytics(analytics == 'exact') if analytics else None
+        # Running totals, per-DN counts and per-minute rates kept while parsing
+        self.aggregates = RegistrationAggregates(per_value=self.analytics is None)
+        self.counters = self.aggregates.counters  # event type / 'FAILED' -> count
+        # Shared copies of DNs, IPs and ports across the kept timeline; a bounded
+        # timeline holds too few events for the table to pay for itself
+        self.symbols = None if max_events else SymbolTable()
+        self.clock = log_clock(log_file)  # HH:MM:SS.mmm -> epoch ms across midnight
+        self.offset = 0  # byte offset of the next unparsed line
+        self.since = since  # epoch ms bounds of the events kept (inclusive), None for open
+        self.until = until
+        self.dns = set(dns) if dns else None  # DNs to keep, None for all
+        self.message_start = None  # last SIPTR start line, timestamps the failure after it
+        # REGISTER <-> response correlation, only when latency is reported
+        self.transactions = RegistrationTracker() if track_latency else None
         
-    def parse(self):
-        """Parse the SIP log file"""
+    def parse(self, workers=1):
+        """Parse the SIP log file
+
+        The file is read in STREAM_BUFFER_SIZE chunks and scanned through a
+        sliding window of MESSAGE_WINDOW decoded lines, which is all the
+        message handlers ever look at. Peak RSS is therefore bounded by
+        roughly STREAM_BUFFER_SIZE + MESSAGE_WINDOW * (longest line) on top of
+        the parsed registrations/events, regardless of the log size.
+        
+        With workers > 1 the file is split into byte ranges that are parsed
+        in a process pool (see _parse_parallel); the result is identical.
+        With since/until only the byte range holding that time span is read
+        (see _parse_slice). Compressed logs (see open_log) are decompressed
+        while streaming and always parsed serially and in full, as their byte
+        offsets cannot be seeked to.
+        """
         print(f"\n[*] Parsing: {self.log_file}")
         print(f"File size: {Path(self.log_file).stat().st_size / (1024*1024):.2f} MB")
         
-        with open(self.log_file, 'r', encoding='utf-8', errors='ignore') as f:
-            lines = f.readlines()
+        if workers > 1 and is_compressed(self.log_file):
+            print("[!] Compressed log cannot be split - parsing serially")
+            workers = 1
+        
+        if (self.since is not None or self.until is not None) and not is_compressed(self.log_file):
+            total_lines = self._parse_slice()
+        elif workers > 1:
+            total_lines = self._parse_parallel(workers)
+        else:
+            with open_log(self.log_file) as f:
+                total_lines = self._scan(f)
+        
+        print(f"Total lines: {total_lines:,}\n")
+    
+    def _parse_slice(self):
+        """Parse only the bytes between since and until, found by binary search
+        
+        Each probe seeks, resyncs to the next HH:MM:SS.mmm line and compares
+        its time, so only a few KB are read per probe. Times of day are placed
+        after the log start (see log_day_ms), so this assumes the log spans
+        less than a day, which holds for rotated SIP_P logs.
+        """
+        size = Path(self.log_file).stat().st_size
+        log_start = self.clock.day_ms, self.clock.last
+        
+        with open(self.log_file, 'rb') as f:
+            start = 0 if self.since is None else _find_offset(f, size, log_start, self.since)
+            end = size if self.until is None else _find_offset(f, size, log_start, self.until + 1)
+            line_time = _line_time(f, start)
+        
+        print(f"[*] Time range: bytes {start:,}-{max(start, end):,} of {size:,}")
+        if line_time is not None:
+            # Start the clock on the day of the first line of the slice
+            time_ms = line_time[1]
+            self.clock.day_ms = log_day_ms(log_start, time_ms) - time_ms
+            self.clock.last = time_ms
+        
+        with open(self.log_file, 'rb', buffering=STREAM_BUFFER_SIZE) as f:
+            return self._scan(_iter_range(f, start, end), start_offset=start)
+    
+    def parse_many(self, log_files, workers=None):
+        """Parse several rotated logs concurrently and merge them into one timeline
+        
+        Every file is parsed in its own process (workers defaults to the CPU
+        count), then the per-file event streams are k-way merged by epoch ts.
+        Registrations are replayed from the merged order, so an endpoint that
+        registered in an older rotation shows up in the final state. Compressed
+        rotations are decompressed by their worker, so several archives are
+        decompressed in parallel.
+        """
+        print(f"\n[*] Parsing {len(log_files)} log files: {self.log_file}")
+        
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(partial(_parse_range, bytes_mode=self.bytes_mode,
+                                            since=self.since, until=self.until, dns=self.dns),
+                                    log_files, [0] * len(log_files), [None] * len(log_files)))
+        
+        for log_file, (_, _, lines) in zip(log_files, results):
+            print(f"  {log_file}: {lines:,} lines")
+        
+        # heapq.merge is stable, so equal timestamps keep file order
+        self._replay(heapq.merge(*(events for events, _, _ in results), key=attrgetter('ts')),
+                     heapq.merge(*(failed for _, failed, _ in results), key=_failure_ts))
+        
+        total_lines = sum(lines for _, _, lines in results)
+        print(f"Total lines: {total_lines:,}\n")
+    
+    def _parse_parallel(self, workers):
+        """Parse byte ranges of the log in a process pool and merge in file order"""
+        size = Path(self.log_file).stat().st_size
+        
+        # Move every split point forward to a safe message boundary
+        with open(self.log_file, 'rb', buffering=STREAM_BUFFER_SIZE) as f:
+            splits = [0]
+            for n in range(1, workers):
+                boundary = _next_boundary(f, max(size * n // workers, splits[-1]))
+                if boundary > splits[-1]:
+                    splits.append(boundary)
+        splits.append(size)
+        ranges = [(start, end) for start, end in zip(splits, splits[1:]) if end > start]
+        
+        total_lines = 0
+        last_ts = None
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(partial(_parse_range, bytes_mode=self.bytes_mode, dns=self.dns),
+                               [self.log_file] * len(ranges),
+                               [start for start, _ in ranges], [end for _, end in ranges])
+            for events, failed, lines in results:
+                # A chunk's clock starts on the log's first day: move the chunk
+                # to the day the serial clock would be on at its first timestamp
+                if events and last_ts is not None:
+                    first_day, first_ms = divmod(events[0].ts, DAY_MS)
+                    last_day, last_ms = divmod(last_ts, DAY_MS)
+                    day = last_day + 1 if first_ms < last_ms - ROLLOVER_MS else last_day
+                    shift = (day - first_day) * DAY_MS
+                    for event in events:
+                        event.ts += shift
+                    for failure in failed:
+                        if failure['ts'] is not None:
+                            failure['ts'] += shift
+                if events:
+                    last_ts = events[-1].ts
+                
+                # Registration state depends on event order, so replay it
+                self._replay(events, failed)
+                total_lines += lines
+        
+        return total_lines
+    
+    def parse_incremental(self, checkpoint_file):
+        """Parse only the bytes appended since the last run
+        
+        The checkpoint stores the log's inode, the byte offset read up to, the
+        raw bytes of a trailing message that was still incomplete (carry), the
+        log clock and the registrations/aggregates built so far. When the inode changed
+        (rotation) or the file shrank (truncation) it falls back to a full
+        parse. Events and the timeline only cover the newly parsed bytes.
+        Compressed logs are never appended to and are always parsed in full.
+        """
+        if is_compressed(self.log_file):
+            self.parse()
+            print("[!] Compressed log - checkpoint not used")
+            return
+        
+        stat = Path(self.log_file).stat()
+        checkpoint = load_checkpoint(checkpoint_file)
+        
+        print(f"\n[*] Parsing: {self.log_file}")
+        print(f"File size: {stat.st_size / (1024*1024):.2f} MB")
+        
+        offset, carry = 0, b''
+        if checkpoint:
+            if checkpoint['log_file'] != str(self.log_file) or checkpoint['inode'] != stat.st_ino:
+                print("[!] Log file rotated since last checkpoint - full parse")
+            elif stat.st_size < checkpoint['offset']:
+                print("[!] Log file truncated since last checkpoint - full parse")
+            else:
+                offset = checkpoint['offset']
+                carry = base64.b64decode(checkpoint['carry'])
+                self.registrations = checkpoint['registrations']
+                if 'aggregates' in checkpoint:
+                    self.aggregates.load(checkpoint['aggregates'])
+                else:
+                    self.counters.update(checkpoint['counters'])
+                if 'clock' in checkpoint:
+                    self.clock.day_ms, self.clock.last = checkpoint['clock']
+                print(f"[*] Resuming at byte {offset:,} ({stat.st_size - offset:,} new bytes)")
+        
+        with open(self.log_file, 'rb', buffering=STREAM_BUFFER_SIZE) as f:
+            total_lines, offset, carry = self._parse_appended(f, offset, stat.st_size, carry)
+        
+        save_checkpoint(checkpoint_file, {
+            'log_file': str(self.log_file),
+            'inode': stat.st_ino,
+            'offset': offset,
+            'carry': base64.b64encode(carry).decode('ascii'),
+            'registrations': self.registrations,
+            'aggregates': self.aggregates.as_dict(),
+            'clock': [self.clock.day_ms, self.clock.last]
+        })
+        
+        print(f"Total lines: {total_lines:,}\n")
+    
+    def _parse_appended(self, f, offset, size, carry):
+        """Scan carry plus the bytes of f from offset up to size
+        
+        Returns (lines, offset to resume at, new carry). The carry holds the
+        raw bytes of a trailing message that may still be incomplete; a line
+        being written while it is read is finished before the scan stops.
+        """
+        raw_lines = chain(io.BytesIO(carry), _iter_range(f, offset, size))
+        total_lines = self._scan(_join_lines(raw_lines), start_offset=offset - len(carry),
+                                 final=False)
+        if self.offset >= size:
+            return total_lines, self.offset, b''
+        
+        # Keep the unfinished tail as carry for the next pass
+        f.seek(self.offset)
+        return total_lines, size, f.read(size - self.offset)
+    
+    def follow(self, interval=2.0, redraw=None):
+        """Parse the log, then keep applying the messages appended to it
+        
+        Every interval seconds the open file is checked for new bytes, which
+        are scanned from the last offset with the carry of parse_incremental,
+        so each poll costs the new bytes only. redraw is called after a poll
+        that parsed something. Once the log is drained and a newer
+        SIP_P-001.*.log has appeared next to it, the rest of the carry is
+        parsed and following moves on to the new log. A shrunken file is read
+        again from the start. Returns on Ctrl-C.
+        """
+        pattern = str(Path(self.log_file).with_name('SIP_P-001.*.log'))
+        print(f"\n[*] Following: {self.log_file} (every {interval:g}s, Ctrl-C to stop)")
+        
+        f = open(self.log_file, 'rb', buffering=STREAM_BUFFER_SIZE)
+        offset, carry = 0, b''
+        try:
+            while True:
+                size = os.fstat(f.fileno()).st_size
+                if size < offset:
+                    print(f"[!] {self.log_file} truncated - reading from the start")
+                    offset, carry = 0, b''
+                
+                if size > offset:
+                    _, offset, carry = self._parse_appended(f, offset, size, carry)
+                    if redraw:
+                        redraw()
+                else:
+                    latest = find_latest_log(pattern)
+                    if latest and log_sort_key(latest) > log_sort_key(self.log_file):
+                        # Drained: finish the last message and switch logs
+                        self._scan(_join_lines([carry]), start_offset=offset - len(carry))
+                        f.close()
+                        print(f"[*] Log rotated - following: {latest}")
+                        self.log_file = latest
+                        self.clock = log_clock(latest)
+                        f = open(latest, 'rb', buffering=STREAM_BUFFER_SIZE)
+                        offset, carry = 0, b''
+                        continue
+                
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            # Stopped: report the trailing message as a batch parse would
+            self._scan(_join_lines([carry]), start_offset=offset - len(carry))
+        finally:
+            f.close()
+    
+    def parse_lookup(self, log_files, key, value):
+        """Parse only the message blocks the sidecar indexes list for key == value
         
-        print(f"Total lines: {len(lines):,}\n")
+        Each log's index is brought up to date first (see update_index); then
+        the log is read at the indexed offsets only, one MESSAGE_WINDOW each.
+        Offsets are visited in ascending order and only ever read forward (see
+        _read_blocks), so compressed logs need no seeking.
+        """
+        print(f"\n[*] Looking up {key}={value} in {len(log_files)} log file(s)")
+        total_blocks = 0
         
-        i = 0
-        while i < len(lines):
-            line = lines[i]
+        for log_file in log_files:
+            index = update_index(log_file)
+            blocks = index.blocks(key, value)
+            index.close()
+            print(f"  {log_file}: {len(blocks):,} blocks")
+            total_blocks += len(blocks)
             
+            with open_log(log_file) as f:
+                windows = _read_blocks(f, [offset for offset, _ in blocks])
+                for (offset, ts), raw_lines in zip(blocks, windows):
+                    lines = [raw if self.bytes_mode else raw.decode('utf-8', errors='ignore')
+                             for raw in raw_lines]
+                    # Put the clock on the block's day, so the event gets the indexed ts
+                    self.clock.day_ms, self.clock.last = ts - ts % DAY_MS, ts % DAY_MS
+                    self._dispatch(lines)
+        
+        print(f"Total blocks: {total_blocks:,}\n")
+    
+    def _scan(self, raw_lines, start_offset=0, final=True):
+        """Feed raw log lines through the message window, return the line count
+        
+        self.offset follows the byte offset of the window head. With final
+        False the scan stops in front of a trailing message that may still be
+        incomplete, leaving self.offset at its first byte.
+        """
+        window = deque()
+        sizes = deque()
+        self.offset = start_offset
+        total_lines = 0
+        prefilter = self.patterns.prefilter.search
+        bytes_mode = self.bytes_mode
+        
+        for raw in raw_lines:
+            window.append(raw if bytes_mode else raw.decode('utf-8', errors='ignore'))
+            sizes.append(len(raw))
+            total_lines += 1
+            if len(window) == MESSAGE_WINDOW:
+                if prefilter(window[0]) is None:
+                    # Noise line: drop it without going through _dispatch
+                    window.popleft()
+                    self.offset += sizes.popleft()
+                else:
+                    self._advance(window, sizes)
+        
+        if not final and window and not raw.endswith(b'\n'):
+            # The last line is still being written
+            window.pop()
+            sizes.pop()
+            total_lines -= 1
+        
+        while window:
+            if not final and not _is_complete(window):
+                break
+            self._advance(window, sizes)
+        
+        return total_lines
+    
+    def _advance(self, window, sizes):
+        """Dispatch the window head and drop the lines it consumed"""
+        for _ in range(self._dispatch(window)):
+            window.popleft()
+            self.offset += sizes.popleft()
+    
+    def _dispatch(self, lines):
+        """Handle the message starting at lines[0], return the lines consumed"""
+        p = self.patterns
+        line = lines[0]
+        kind = classify_line(line)
+        
+        if kind == SKIP:
+            return 1
+        
+        if kind == MESSAGE_START:
+            self.message_start = line
+        
+        if kind == MESSAGE_START and len(lines) > 1:
             # Look for REGISTER messages (incoming)
-            if 'SIPTR: Received' in line and i + 1 < len(lines):
-                if 'REGISTER' in lines[i+1]:
-                    i = self._parse_register_message(lines, i)
-                    continue
+            if p.received in line and p.register in lines[1]:
+                return self._parse_register_message(lines, 0)
             
             # Look for 200 OK responses (successful registration)
-            if 'Sending' in line and i + 1 < len(lines):
-                if 'SIP/2.0 200 OK' in lines[i+1]:
-                    i = self._parse_200_ok_message(lines, i)
-                    continue
-            
-            # Look for failed registrations
-            if 'SIP/2.0 401' in line or 'SIP/2.0 403' in line or 'SIP/2.0 4' in line:
-                self._parse_failure(lines, i)
-            
-            i += 1
+            if p.sending in line and p.ok in lines[1]:
+                return self._parse_200_ok_message(lines, 0)
+        
+        # Look for failed registrations (401, 403 and every other 4xx)
+        if kind == FAILURE_STATUS or p.failure in line:
+            self._parse_failure(lines, 0)
+        
+        return 1
     
     def _parse_register_message(self, lines, start_idx):
         """Parse a REGISTER request"""
-        timestamp_match = re.search(r'(\d{2}:\d{2}:\d{2}\.\d{3})', lines[start_idx])
-        timestamp = timestamp_match.group(1) if timestamp_match else "Unknown"
+        p = self.patterns
+        timestamp_match = p.timestamp.search(lines[start_idx])
+        timestamp = p.decode(timestamp_match.group(1)) if timestamp_match else "Unknown"
         
         # Extract source IP
-        source_match = re.search(r'from ([\d\.]+):(\d+)', lines[start_idx])
-        source_ip = source_match.group(1) if source_match else "Unknown"
-        source_port = source_match.group(2) if source_match else "Unknown"
-        
-        # Parse SIP headers
-        dn = None
-        contact = None
-        expires = None
-        call_id = None
-        cseq = None
-        
-        idx = start_idx + 2
-        while idx < len(lines) and idx < start_idx + 20:
-            line = lines[idx].strip()
-            
-            if not line or line.startswith('22:') or line.startswith('23:'):
-                break
-            
-            # Extract DN from From or To header
-            if line.startswith('From:') or line.startswith('To:'):
-                dn_match = re.search(r'sip:(\w+)@', line)
-                if dn_match and not dn:
-                    dn = dn_match.group(1)
-            
-            # Extract Contact
-            if line.startswith('Contact:'):
-                contact_match = re.search(r'<sip:(.+?)>', line)
-                if contact_match:
-                    contact = contact_match.group(1)
-            
-            # Extract Expires
-            if line.startswith('Expires:'):
-                expires_match = re.search(r'Expires:\s*(\d+)', line)
-                if expires_match:
-                    expires = int(expires_match.group(1))
-            
-            # Extract Call-ID
-            if line.startswith('Call-ID:'):
-                call_id = line.split(':', 1)[1].strip()
-            
-            # Extract CSeq
-            if line.startswith('CSeq:'):
-                cseq_match = re.search(r'(\d+)\s+REGISTER', line)
-                if cseq_match:
-                    cseq = int(cseq_match.group(1))
-            
-            idx += 1
+        source_match = p.source.search(lines[start_idx])
+        source_ip = p.decode(source_match.group(1)) if source_match else "Unknown"
+        source_port = p.decode(source_match.group(2)) if source_match else "Unknown"
         
-        if dn:
-            event = {
-                'timestamp': timestamp,
-                'type': 'REGISTER_REQUEST',
-                'dn': dn,
-                'source_ip': source_ip,
-                'source_port': source_port,
-                'contact': contact,
-                'expires': expires,
-                'call_id': call_id,
-                'cseq': cseq
-            }
-            self.events.append(event)
+        headers = extract_headers(lines, start_idx)
+        ts = self.clock.ts(timestamp)
+        
+        if headers.dn and self._wanted(headers.dn, ts):
+            event = RegistrationEvent(timestamp, ts, 'REGISTER_REQUEST',
+                                      headers.dn, source_ip, source_port, headers.contact,
+                                      headers.expires, headers.call_id, headers.cseq)
+            self._record_event(event)
         
-        return idx
+        return headers.end
     
     def _parse_200_ok_message(self, lines, start_idx):
         """Parse a 200 OK response"""
-        timestamp_match = re.search(r'(\d{2}:\d{2}:\d{2}\.\d{3})', lines[start_idx])
-        timestamp = timestamp_match.group(1) if timestamp_match else "Unknown"
+        p = self.patterns
+        timestamp_match = p.timestamp.search(lines[start_idx])
+        timestamp = p.decode(timestamp_match.group(1)) if timestamp_match else "Unknown"
         
         # Extract destination IP
-        dest_match = re.search(r'to ([\d\.]+):(\d+)', lines[start_idx])
-        dest_ip = dest_match.group(1) if dest_match else "Unknown"
-        dest_port = dest_match.group(2) if dest_match else "Unknown"
-        
-        # Parse SIP headers
-        dn = None
-        contact = None
-        expires = None
-        call_id = None
-        cseq = None
-        
-        idx = start_idx + 2
-        while idx < len(lines) and idx < start_idx + 20:
-            line = lines[idx].strip()
-            
-            if not line or line.startswith('22:') or line.startswith('23:'):
-                break
-            
-            # Extract DN from From or To header
-            if line.startswith('From:') or line.startswith('To:'):
-                dn_match = re.search(r'sip:(\w+)@', line)
-                if dn_match and not dn:
-                    dn = dn_match.group(1)
-            
-            # Extract Contact with expires
-            if line.startswith('Contact:'):
-                contact_match = re.search(r'<sip:(.+?)>', line)
-                if contact_match:
-                    contact = contact_match.group(1)
-                expires_match = re.search(r'expires=(\d+)', line)
-                if expires_match:
-                    expires = int(expires_match.group(1))
-            
-            # Extract Expires header
-            if line.startswith('Expires:') and not expires:
-                expires_match = re.search(r'Expires:\s*(\d+)', line)
-                if expires_match:
-                    expires = int(expires_match.group(1))
-            
-            # Extract Call-ID
-            if line.startswith('Call-ID:'):
-                call_id = line.split(':', 1)[1].strip()
-            
-            # Extract CSeq
-            if line.startswith('CSeq:'):
-                cseq_match = re.search(r'(\d+)\s+REGISTER', line)
-                if cseq_match:
-                    cseq = int(cseq_match.group(1))
-            
-            idx += 1
-        
-        if dn:
-            # Update registrations table
-            if expires and expires > 0:
-                self.registrations[dn] = {
-                    'status': 'Registered',
-                    'contact': contact,
-                    'expires': expires,
-                    'last_updated': timestamp,
-                    'dest_ip': dest_ip,
-                    'dest_port': dest_port,
-                    'call_id': call_id
-                }
+        dest_match = p.dest.search(lines[start_idx])
+        dest_ip = p.decode(dest_match.group(1)) if dest_match else "Unknown"
+        dest_port = p.decode(dest_match.group(2)) if dest_match else "Unknown"
+        
+        headers = extract_headers(lines, start_idx)
+        
+        # The Contact expires parameter overrides the Expires header
+        expires = headers.contact_expires
+        if expires is None:
+            expires = headers.expires
+        
+        ts = self.clock.ts(timestamp)
+        
+        if headers.dn and self._wanted(headers.dn, ts):
+            event_type = '200_OK' if expires and expires > 0 else 'UNREGISTER_OK'
+            event = RegistrationEvent(timestamp, ts, event_type,
+                                      headers.dn, dest_ip, dest_port, headers.contact,
+                                      expires, headers.call_id, headers.cseq)
+            self._record_event(event)
+        
+        return headers.end
+    
+    def _wanted(self, dn, ts):
+        """True if a message for dn at ts passes the --dn/--since/--until filters"""
+        if self.dns is not None and dn not in self.dns:
+            return False
+        if ts is None:
+            return self.since is None and self.until is None
+        return ((self.since is None or ts >= self.since) and
+                (self.until is None or ts <= self.until))
+    
+    def _replay(self, events, failed):
+        """Record worker results in log order, events and failures merged by ts"""
+        for record in heapq.merge(((event.ts, event) for event in events),
+                                  ((_failure_ts(failure), failure) for failure in failed),
+                                  key=itemgetter(0)):
+            if isinstance(record[1], dict):
+                self._record_failure(record[1])
             else:
-                # Unregistration (expires=0)
-                if dn in self.registrations:
-                    del self.registrations[dn]
-            
-            event = {
-                'timestamp': timestamp,
-                'type': '200_OK' if expires and expires > 0 else 'UNREGISTER_OK',
-                'dn': dn,
-                'contact': contact,
-                'expires': expires,
-                'dest_ip': dest_ip,
-                'dest_port': dest_port,
-                'call_id': call_id,
-                'cseq': cseq
-            }
-            self.events.append(event)
+                self._record_event(record[1])
+    
+    def _record_event(self, event):
+        """Add an event to the timeline and update registrations/aggregates"""
+        if self.symbols is not None:
+            event.intern(self.symbols)
+        self._apply_registration(event)
+        self.events.append(event)
+        self.aggregates.add_event(event)
+        if self.analytics is not None:
+            self.analytics.add_event(event)
         
-        return idx
+        for listener in self.listeners:
+            listener(event)
+        if self.transactions is not None:
+            self.transactions.add_event(event)
+    
+    def _record_failure(self, failure):
+        """Add a failed registration attempt"""
+        self.failed_registrations.append(failure)
+        self.aggregates.add_failure(failure)
+        if self.transactions is not None:
+            self.transactions.add_failure(failure)
+    
+    def _apply_registration(self, event):
+        """Update the registrations table from a 200 OK / unregister event"""
+        if event.type == '200_OK':
+            self.registrations[event.dn] = {
+                'status': 'Registered',
+                'contact': event.contact,
+                'expires': event.expires,
+                'last_updated': event.timestamp,
+                'dest_ip': event.ip,
+                'dest_port': event.port,
+                'call_id': event.call_id
+            }
+        elif event.type == 'UNREGISTER_OK':
+            # Unregistration (expires=0)
+            self.registrations.pop(event.dn, None)
     
     def _parse_failure(self, lines, idx):
         """Parse failed registration attempts"""
+        p = self.patterns
         line = lines[idx]
-        timestamp_match = re.search(r'(\d{2}:\d{2}:\d{2}\.\d{3})', line)
-        timestamp = timestamp_match.group(1) if timestamp_match else "Unknown"
+        timestamp_match = p.timestamp.search(line)
+        if timestamp_match is None and self.message_start is not None:
+            # The status line has no timestamp, the SIPTR line in front of it does
+            timestamp_match = p.timestamp.search(self.message_start)
+        timestamp = p.decode(timestamp_match.group(1)) if timestamp_match else "Unknown"
+        ts = self.clock.ts(timestamp) if timestamp_match else None
         
         # Get status code
-        status_match = re.search(r'SIP/2.0 (\d+) (.+)', line)
+        status_match = p.status.search(line)
         if status_match:
-            status_code = status_match.group(1)
-            status_text = status_match.group(2).strip()
+            # Headers follow the status line as they follow a request line
+            headers = extract_headers(lines, idx - 1)
+            if not self._wanted(headers.dn, ts):
+                return
             
-            self.failed_registrations.append({
+            status_code = p.decode(status_match.group(1))
+            status_text = p.decode(status_match.group(2).strip())
+            
+            self._record_failure({
                 'timestamp': timestamp,
+                'ts': ts,
+                'dn': headers.dn,
+                'call_id': headers.call_id,
+                'cseq': headers.cseq,  # None unless it answers a REGISTER
                 'status_code': status_code,
                 'status_text': status_text,
-                'line': line.strip()
+                'line': p.decode(line.strip())
             })
     
     def print_summary(self):
@@ -247,21 +792,32 @@ class SIPLogParser:
         else:
             print("No registered endpoints found.")
         
-        print(f"\n[*] Total Registration Events: {len([e for e in self.events if e['type'] == 'REGISTER_REQUEST'])}")
-        print(f"[+] Successful Registrations: {len([e for e in self.events if e['type'] == '200_OK'])}")
-        print(f"[~] Unregistrations: {len([e for e in self.events if e['type'] == 'UNREGISTER_OK'])}")
-        print(f"[-] Failed Attempts: {len(self.failed_registrations)}")
+        print(f"\n[*] Total Registration Events: {self.counters['REGISTER_REQUEST']}")
+        print(f"[+] Successful Registrations: {self.counters['200_OK']}")
+        print(f"[~] Unregistrations: {self.counters['UNREGISTER_OK']}")
+        print(f"[-] Failed Attempts: {self.counters['FAILED']}")
+        
+        aggregates = self.aggregates
+        if aggregates.first_seen is not None:
+            print(f"\n[*] Activity: {format_ts(aggregates.first_seen)} - "
+                  f"{format_ts(aggregates.last_seen)}")
+            minute, count = aggregates.peak_rate('REGISTER_REQUEST')
+            if count:
+                print(f"[*] Peak rate: {count:,} REGISTER/min at {format_ts(minute)[:16]}")
         
         # Show unique DNs that registered
-        registered_dns = set(e['dn'] for e in self.events if e['type'] in ['REGISTER_REQUEST', '200_OK'])
-        print(f"\n[*] Unique DNs Seen: {len(registered_dns)}")
-        if registered_dns:
-            print(f"DNs: {', '.join(sorted(registered_dns))}")
+        if self.analytics is not None:
+            self.analytics.print_report()
+            return
+        
+        dns_seen = aggregates.registered_dns()
+        print(f"\n[*] Unique DNs Seen: {len(dns_seen)}")
+        if dns_seen:
+            print(f"DNs: {', '.join(sorted(dns_seen))}")
         
         # Show source IPs
-        source_ips = set(e.get('source_ip') for e in self.events if e.get('source_ip') and e.get('source_ip') != 'Unknown')
-        if source_ips:
-            print(f"\n[*] Source IPs: {', '.join(sorted(source_ips))}")
+        if aggregates.source_ips:
+            print(f"\n[*] Source IPs: {', '.join(sorted(aggregates.source_ips))}")
     
     def print_timeline(self, limit=20):
         """Print recent registration events"""
@@ -270,13 +826,10 @@ class SIPLogParser:
         print(f"{'Time':<15} {'Event':<20} {'DN':<10} {'Contact':<30} {'Expires':<10}")
         print("-" * 120)
         
-        for event in self.events[-limit:]:
-            event_type = event['type'].replace('_', ' ')
-            dn = event.get('dn', 'N/A')
-            contact = event.get('contact', 'N/A')
-            expires = event.get('expires', 'N/A')
+        for event in islice(self.events, max(len(self.events) - limit, 0), None):
+            event_type = event.type.replace('_', ' ')
             
-            print(f"{event['timestamp']:<15} {event_type:<20} {dn:<10} {contact:<30} {str(expires):<10}")
+            print(f"{event.timestamp:<15} {event_type:<20} {event.dn:<10} {event.contact:<30} {str(event.expires):<10}")
     
     def print_failed_registrations(self, limit=10):
         """Print failed registration attempts"""
@@ -286,66 +839,1293 @@ class SIPLogParser:
         print(f"\n[-] Failed Registration Attempts (last {limit}):")
         print("-" * 120)
         
-        for failure in self.failed_registrations[-limit:]:
+        for failure in islice(self.failed_registrations,
+                              max(len(self.failed_registrations) - limit, 0), None):
             print(f"{failure['timestamp']} - {failure['status_code']} {failure['status_text']}")
     
+    def print_latency(self, limit=20):
+        """Print REGISTER transaction statistics and latency percentiles"""
+        tracker = self.transactions
+        if tracker is None:
+            return
+        tracker.finish()
+        
+        print("\n[*] REGISTER Transactions:")
+        print("-" * 80)
+        print(f"Answered: {tracker.answered:,}  Retransmitted requests: {tracker.retransmissions:,}  "
+              f"Retransmitted responses: {tracker.response_retransmissions:,}")
+        print(f"Unanswered (>{TRANSACTION_TIMEOUT_MS // 1000}s): {tracker.unanswered:,}  "
+              f"Pending at end: {tracker.pending_at_end:,}  Unmatched responses: {tracker.orphans:,}")
+        print(f"401/407 challenges: {tracker.challenges:,}  "
+              f"Completed after challenge: {tracker.round_trips.total:,}")
+        
+        rows = [('all', tracker.overall)]
+        if tracker.round_trips.total:
+            rows.append(('challenge round trip', tracker.round_trips))
+        for title, histograms in (('DN', tracker.by_dn), ('Source IP', tracker.by_ip)):
+            print(f"\n[*] Registration latency by {title} (ms, top {limit} by count):")
+            print(f"{title:<22} {'Count':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'Max':>8}")
+            print("-" * 80)
+            ranked = sorted(histograms.items(), key=lambda item: (-item[1].total, item[0]))
+            for name, histogram in rows + ranked[:limit]:
+                print(f"{name:<22} {histogram.total:>8,} {histogram.percentile(50):>8,} "
+                      f"{histogram.percentile(95):>8,} {histogram.percentile(99):>8,} "
+                      f"{histogram.max:>8,}")
+    
     def export_json(self, output_file='sip-registrations.json'):
         """Export registrations to JSON"""
-        import json
-        
         data = {
             'timestamp': datetime.now().isoformat(),
             'log_file': str(self.log_file),
             'registered_endpoints': self.registrations,
-            'events': self.events,
+            'events': [event.as_dict() for event in self.events],
             'summary': {
                 'total_registered': len(self.registrations),
-                'total_events': len(self.events),
-                'failed_registrations': len(self.failed_registrations)
+                'total_events': sum(self.counters[event_type] for event_type in EVENT_TYPES),
+                'failed_registrations': self.counters['FAILED']
             }
         }
+        data['aggregates'] = self.aggregates.as_dict()
+        if self.analytics is not None:
+            data['analytics'] = self.analytics.as_dict()
         
         with open(output_file, 'w') as f:
             json.dump(data, f, indent=2)
         
         print(f"\n[+] Exported to: {output_file}")
+    
+    def summary_record(self):
+        """Trailer record of an NDJSON export, built from the running counters"""
+        return {
+            'type': 'SUMMARY',
+            'timestamp': datetime.now().isoformat(),
+            'log_file': str(self.log_file),
+            'registered_endpoints': self.registrations,
+            'summary': {
+                'total_registered': len(self.registrations),
+                'total_events': sum(self.counters[event_type] for event_type in EVENT_TYPES),
+                'failed_registrations': self.counters['FAILED']
+            }
+        }
+    
+    def export_columnar(self, output_base='sip-registrations'):
+        """Export the event timeline as typed columns
+        
+        Writes <output_base>.parquet when pyarrow is installed, otherwise a
+        NumPy <output_base>.npz holding an 'events' structured array plus the
+        '<column>_categories' arrays its categorical codes index into.
+        Columns: ts (epoch ms), type/dn/ip/contact (categorical), port and
+        expires (int32), call_id (str), cseq (int64); in the .npz missing
+        integers are -1.
+        """
+        columns = {name: [] for name in ('ts', 'type', 'dn', 'ip', 'port', 'contact',
+                                          'expires', 'call_id', 'cseq')}
+        for event in self.events:
+            columns['ts'].append(event.ts)
+            columns['type'].append(event.type)
+            columns['dn'].append(event.dn)
+            columns['ip'].append(event.ip)
+            columns['port'].append(int(event.port) if event.port.isdigit() else None)
+            columns['contact'].append(event.contact or '')
+            columns['expires'].append(event.expires)
+            columns['call_id'].append(event.call_id or '')
+            columns['cseq'].append(event.cseq)
+        
+        categorical = {name: _categorical(columns[name]) for name in ('type', 'dn', 'ip', 'contact')}
+        
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            pa = None
+        
+        if pa is not None:
+            output_file = f"{output_base}.parquet"
+            table = pa.table({
+                'ts': pa.array(columns['ts'], pa.timestamp('ms')),
+                **{name: pa.DictionaryArray.from_arrays(pa.array(codes, pa.int32()),
+                                                        pa.array(categories, pa.string()))
+                   for name, (categories, codes) in categorical.items()},
+                'port': pa.array(columns['port'], pa.int32()),
+                'expires': pa.array(columns['expires'], pa.int32()),
+                'call_id': pa.array(columns['call_id'], pa.string()),
+                'cseq': pa.array(columns['cseq'], pa.int64())
+            })
+            pq.write_table(table, output_file)
+        else:
+            try:
+                import numpy as np
+            except ImportError:
+                print("\n[-] Columnar export needs pyarrow or numpy")
+                return None
+            
+            output_file = f"{output_base}.npz"
+            call_id_width = max((len(call_id) for call_id in columns['call_id']), default=1)
+            events = np.zeros(len(self.events), dtype=[
+                ('ts', 'M8[ms]'), ('type', 'i4'), ('dn', 'i4'), ('ip', 'i4'), ('port', 'i4'),
+                ('contact', 'i4'), ('expires', 'i4'), ('call_id', f'U{max(call_id_width, 1)}'),
+                ('cseq', 'i8')
+            ])
+            missing = lambda values: [-1 if value is None else value for value in values]
+            events['ts'] = columns['ts']
+            for name, (_, codes) in categorical.items():
+                events[name] = codes
+            events['port'] = missing(columns['port'])
+            events['expires'] = missing(columns['expires'])
+            events['call_id'] = columns['call_id']
+            events['cseq'] = missing(columns['cseq'])
+            np.savez_compressed(output_file, events=events, **{
+                f"{name}_categories": np.array(categories, dtype=str)
+                for name, (categories, _) in categorical.items()
+            })
+        
+        print(f"[+] Exported to: {output_file}")
+        return output_file
+
+class NDJSONExporter:
+    """Write events as newline-delimited JSON while the log is being parsed
+    
+    Every event becomes one line as soon as the parser records it, optionally
+    compressed on the fly with gzip or zstd (zstandard package). close()
+    appends a SUMMARY trailer record. output_file '-' writes to stdout.
+    """
+    def __init__(self, output_file, compress=None):
+        self.output_file = output_file
+        if output_file == '-':
+            self.raw = sys.stdout.buffer
+        else:
+            self.raw = open(output_file, 'wb')
+        
+        if compress == 'gzip':
+            self.stream = gzip.GzipFile(fileobj=self.raw, mode='wb')
+        elif compress == 'zstd':
+            try:
+                import zstandard
+            except ImportError:
+                print("[-] Error: zstd compression requires the zstandard package")
+                sys.exit(1)
+            self.stream = zstandard.ZstdCompressor().stream_writer(self.raw, closefd=False)
+        else:
+            self.stream = self.raw
+        # Plain output is flushed per event so a reader (jq, shipper) sees it live
+        self.flush = compress is None
+        self.count = 0
+    
+    def write_event(self, event):
+        """Parser listener: write one event line"""
+        self.write(event.as_dict())
+    
+    def write(self, record):
+        """Write one JSON record as a line"""
+        self.stream.write(json.dumps(record).encode('utf-8') + b'\n')
+        if self.flush:
+            self.stream.flush()
+        self.count += 1
+    
+    def close(self, trailer=None):
+        """Write the trailer record and finish the compressed stream"""
+        if trailer is not None:
+            self.write(trailer)
+        if self.stream is not self.raw:
+            self.stream.close()
+        if self.output_file == '-':
+            self.raw.flush()
+        else:
+            self.raw.close()
+
+class SQLiteStore:
+    """Store events in an SQLite database while the log is being parsed
+    
+    Events are buffered and inserted SQLITE_BATCH_SIZE at a time, each batch
+    in one transaction through one prepared executemany() statement, with the
+    database in WAL mode. The same batch upserts the registrations table
+    (newest ts per DN wins), so later runs, e.g. with --checkpoint, append to
+    the same database; events stored by an earlier run are ignored.
+    """
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS events (
+            ts INTEGER NOT NULL,
+            timestamp TEXT NOT NULL,
+            type TEXT NOT NULL,
+            dn TEXT,
+            ip TEXT,  -- endpoint address: REGISTER source, response destination
+            port TEXT,
+            contact TEXT,
+            expires INTEGER,
+            call_id TEXT,
+            cseq INTEGER
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS events_key ON events (ts, type, call_id, cseq);
+        CREATE INDEX IF NOT EXISTS events_dn_ts ON events (dn, ts);
+        CREATE INDEX IF NOT EXISTS events_call_id ON events (call_id);
+        CREATE INDEX IF NOT EXISTS events_ip ON events (ip);
+        CREATE TABLE IF NOT EXISTS registrations (
+            dn TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            contact TEXT,
+            expires INTEGER,
+            last_updated TEXT,
+            dest_ip TEXT,
+            dest_port TEXT,
+            call_id TEXT,
+            ts INTEGER NOT NULL
+        );
+    '''
+    INSERT_EVENT = 'INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+    UPSERT_REGISTRATION = '''
+        INSERT INTO registrations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (dn) DO UPDATE SET
+            status = excluded.status, contact = excluded.contact, expires = excluded.expires,
+            last_updated = excluded.last_updated, dest_ip = excluded.dest_ip,
+            dest_port = excluded.dest_port, call_id = excluded.call_id, ts = excluded.ts
+        WHERE excluded.ts >= registrations.ts
+    '''
+    event_row = attrgetter('ts', 'timestamp', 'type', 'dn', 'ip', 'port', 'contact', 'expires',
+                           'call_id', 'cseq')
+    
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.db = sqlite3.connect(db_file)
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('PRAGMA synchronous = NORMAL')  # WAL stays consistent, fsync per checkpoint
+        self.db.executescript(self.SCHEMA)
+        self.pending = []
+        self.count = 0  # events inserted, duplicates of stored events excluded
+    
+    def write_event(self, event):
+        """Parser listener: queue one event, insert a full batch"""
+        self.pending.append(event)
+        if len(self.pending) >= SQLITE_BATCH_SIZE:
+            self.flush()
+    
+    def flush(self):
+        """Insert the queued events and upsert their DNs' registrations"""
+        if not self.pending:
+            return
+        events, self.pending = self.pending, []
+        
+        # Only the last 200 OK / unregister of a DN in the batch matters;
+        # unregistered DNs keep a row so an older replayed 200 OK cannot revive them
+        latest = {event.dn: event for event in events if event.type != 'REGISTER_REQUEST'}
+        registrations = [(event.dn, 'Registered' if event.type == '200_OK' else 'Unregistered',
+                          event.contact, event.expires, event.timestamp, event.ip, event.port,
+                          event.call_id, event.ts)
+                         for event in latest.values()]
+        
+        with self.db:
+            cursor = self.db.executemany(self.INSERT_EVENT, map(self.event_row, events))
+            self.count += cursor.rowcount
+            self.db.executemany(self.UPSERT_REGISTRATION, registrations)
+    
+    def close(self):
+        """Insert the last batch and close the database"""
+        self.flush()
+        self.db.execute('PRAGMA optimize')
+        self.db.close()
+
+class LogClock:
+    """Turn HH:MM:SS.mmm log timestamps into epoch milliseconds
+    
+    SIP_P lines only carry the time of day. The clock starts on the log's
+    date and moves to the next day whenever the time of day jumps back by
+    more than ROLLOVER_MS, so ts keeps increasing across midnight. The log
+    clock is taken as UTC.
+    """
+    __slots__ = ('day_ms', 'last')
+    
+    def __init__(self, log_date, start_ms=0):
+        self.day_ms = calendar.timegm(log_date.timetuple()) * 1000  # current day, epoch ms
+        self.last = start_ms  # time of day of the previous timestamp
+    
+    def ts(self, timestamp):
+        """Epoch ms of the next timestamp in log order (the previous one if malformed)"""
+        time_ms = time_of_day_ms(timestamp)
+        if time_ms is None:
+            return self.day_ms + self.last
+        if time_ms < self.last - ROLLOVER_MS:
+            self.day_ms += DAY_MS
+        self.last = time_ms
+        return self.day_ms + time_ms
+
+class DNStats:
+    """Running counts of one DN and when it was first / last seen (epoch ms)"""
+    __slots__ = ('requests', 'ok', 'unregistered', 'failed', 'first_seen', 'last_seen')
+    
+    def __init__(self, requests=0, ok=0, unregistered=0, failed=0, first_seen=None, last_seen=None):
+        self.requests = requests
+        self.ok = ok
+        self.unregistered = unregistered
+        self.failed = failed
+        self.first_seen = first_seen
+        self.last_seen = last_seen
+    
+    def seen(self, ts):
+        if self.first_seen is None or ts < self.first_seen:
+            self.first_seen = ts
+        if self.last_seen is None or ts > self.last_seen:
+            self.last_seen = ts
+    
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class RegistrationAggregates:
+    """Totals maintained while parsing, so summaries never rescan the events
+    
+    counters holds the count per event type and 'FAILED'; per_minute maps the
+    epoch ms of each minute to its counts in RATE_COLUMNS order, which is the
+    registration rate series. With per_value the per-DN stats and per-source-IP
+    REGISTER counts are kept as well (one entry per distinct value).
+    """
+    def __init__(self, per_value=True):
+        self.per_value = per_value
+        self.counters = defaultdict(int)
+        self.per_minute = {}  # minute epoch ms -> [count per RATE_COLUMNS]
+        self.by_dn = {}  # DN -> DNStats
+        self.source_ips = Counter()  # REGISTER source address -> requests
+        self.first_seen = None
+        self.last_seen = None
+    
+    def _seen(self, ts, column):
+        """Count a record of ts in its minute bucket and the overall span"""
+        minute = ts - ts % MINUTE_MS
+        bucket = self.per_minute.get(minute)
+        if bucket is None:
+            bucket = self.per_minute[minute] = [0] * len(RATE_COLUMNS)
+        bucket[column] += 1
+        if self.first_seen is None or ts < self.first_seen:
+            self.first_seen = ts
+        if self.last_seen is None or ts > self.last_seen:
+            self.last_seen = ts
+    
+    def _dn_stats(self, dn):
+        stats = self.by_dn.get(dn)
+        if stats is None:
+            stats = self.by_dn[dn] = DNStats()
+        return stats
+    
+    def add_event(self, event):
+        event_type = event.type
+        self.counters[event_type] += 1
+        self._seen(event.ts, RATE_COLUMNS.index(event_type))
+        if not self.per_value:
+            return
+        
+        stats = self._dn_stats(event.dn)
+        stats.seen(event.ts)
+        if event_type == 'REGISTER_REQUEST':
+            stats.requests += 1
+            if event.ip and event.ip != 'Unknown':
+                self.source_ips[event.ip] += 1
+        elif event_type == '200_OK':
+            stats.ok += 1
+        else:
+            stats.unregistered += 1
+    
+    def add_failure(self, failure):
+        self.counters['FAILED'] += 1
+        ts = failure['ts']
+        if ts is None:
+            return
+        self._seen(ts, len(EVENT_TYPES))
+        if self.per_value and failure['dn']:
+            stats = self._dn_stats(failure['dn'])
+            stats.failed += 1
+            stats.seen(ts)
+    
+    def registered_dns(self):
+        """DNs seen in a REGISTER or 200 OK"""
+        return [dn for dn, stats in self.by_dn.items() if stats.requests or stats.ok]
+    
+    def peak_rate(self, event_type):
+        """(minute epoch ms, count) of the busiest minute for event_type"""
+        column = RATE_COLUMNS.index(event_type)
+        return max(((minute, bucket[column]) for minute, bucket in self.per_minute.items()),
+                   key=itemgetter(1), default=(None, 0))
+    
+    def as_dict(self):
+        """Aggregates in their JSON export / checkpoint shape"""
+        return {
+            'counters': dict(self.counters),
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+            'rate_columns': list(RATE_COLUMNS),
+            'per_minute': [[minute] + bucket for minute, bucket in sorted(self.per_minute.items())],
+            'by_dn': {dn: stats.as_dict() for dn, stats in sorted(self.by_dn.items())},
+            'source_ips': dict(sorted(self.source_ips.items()))
+        }
+    
+    def load(self, data):
+        """Continue from aggregates saved with as_dict()"""
+        self.counters.update(data['counters'])
+        self.first_seen = data['first_seen']
+        self.last_seen = data['last_seen']
+        self.per_minute = {row[0]: row[1:] for row in data['per_minute']}
+        self.by_dn = {dn: DNStats(**stats) for dn, stats in data['by_dn'].items()}
+        self.source_ips = Counter(data['source_ips'])
+
+class SpaceSaving:
+    """Space-saving top-N sketch: the heaviest items in at most capacity counters
+    
+    A new item replaces the smallest counter and inherits its count as the
+    error bound, so every item seen more than total/capacity times is kept
+    and its count is over-estimated by at most its error.
+    """
+    def __init__(self, capacity=ANALYTICS_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}  # item -> [count, error]
+        self.heap = []  # (count, item) min-heap; counts may be stale (too low)
+    
+    def add(self, item):
+        """Count one occurrence of item"""
+        counter = self.counts.get(item)
+        if counter is not None:
+            counter[0] += 1
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = [1, 0]
+            heapq.heappush(self.heap, (1, item))
+        else:
+            # Counts only grow: refresh stale heap entries until the top is current
+            heap = self.heap
+            while heap[0][0] != self.counts[heap[0][1]][0]:
+                heapq.heapreplace(heap, (self.counts[heap[0][1]][0], heap[0][1]))
+            count, victim = heapq.heapreplace(heap, (heap[0][0] + 1, item))
+            del self.counts[victim]
+            self.counts[item] = [count + 1, count]
+    
+    def top(self, n):
+        """[(item, count, error)] of the n heaviest items"""
+        ranked = sorted(self.counts.items(), key=lambda item: (-item[1][0], item[0]))
+        return [(item, count, error) for item, (count, error) in ranked[:n]]
+
+class HyperLogLog:
+    """HyperLogLog distinct counter in 2**precision one-byte registers"""
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+    
+    def add(self, item):
+        """Add one str item"""
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=8).digest()
+        value = int.from_bytes(digest, 'big')
+        bits = 64 - self.precision
+        index = value >> bits
+        rank = bits - (value & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+    
+    def count(self):
+        """Estimated number of distinct items"""
+        m = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / sum(2.0 ** -rank for rank in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small range correction: linear counting
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+class ExactCounter:
+    """Exact top-N and distinct counts, the reference for SpaceSaving/HyperLogLog"""
+    def __init__(self):
+        self.counts = Counter()
+    
+    def add(self, item):
+        """Count one occurrence of item"""
+        self.counts[item] += 1
+    
+    def top(self, n):
+        """[(item, count, 0)] of the n most frequent items"""
+        ranked = sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))
+        return [(item, count, 0) for item, count in ranked[:n]]
+    
+    def count(self):
+        """Number of distinct items"""
+        return len(self.counts)
+
+class RegistrationAnalytics:
+    """Single-pass busiest DNs / source IPs and distinct DN, IP and Call-ID counts
+    
+    The sketch mode uses fixed memory (SpaceSaving and HyperLogLog) however
+    many events go in; exact mode keeps a counter per distinct value.
+    """
+    def __init__(self, exact=False):
+        self.exact = exact
+        if exact:
+            self.top_dns = self.distinct_dns = ExactCounter()
+            self.top_ips = self.distinct_ips = ExactCounter()
+            self.distinct_calls = ExactCounter()
+        else:
+            self.top_dns, self.distinct_dns = SpaceSaving(), HyperLogLog()
+            self.top_ips, self.distinct_ips = SpaceSaving(), HyperLogLog()
+            self.distinct_calls = HyperLogLog()
+    
+    def add_event(self, event):
+        """Count DN and source IP the way the summary does"""
+        if event.type in ('REGISTER_REQUEST', '200_OK'):
+            self.top_dns.add(event.dn)
+            if not self.exact:
+                self.distinct_dns.add(event.dn)
+        if event.type == 'REGISTER_REQUEST' and event.ip and event.ip != 'Unknown':
+            self.top_ips.add(event.ip)
+            if not self.exact:
+                self.distinct_ips.add(event.ip)
+        if event.call_id:
+            self.distinct_calls.add(event.call_id)
+    
+    def as_dict(self, limit=10):
+        """Analytics in their JSON export shape"""
+        return {
+            'mode': 'exact' if self.exact else 'sketch',
+            'distinct_dns': self.distinct_dns.count(),
+            'distinct_source_ips': self.distinct_ips.count(),
+            'distinct_call_ids': self.distinct_calls.count(),
+            'top_dns': [{'dn': dn, 'events': count, 'error': error}
+                        for dn, count, error in self.top_dns.top(limit)],
+            'top_source_ips': [{'ip': ip, 'requests': count, 'error': error}
+                               for ip, count, error in self.top_ips.top(limit)]
+        }
+    
+    def print_report(self, limit=10):
+        """Print distinct counts and the busiest DNs / source IPs"""
+        approx = '' if self.exact else '~'
+        mode = 'exact' if self.exact else 'HyperLogLog / space-saving estimates'
+        print(f"\n[*] Unique DNs Seen: {approx}{self.distinct_dns.count():,}  "
+              f"Source IPs: {approx}{self.distinct_ips.count():,}  "
+              f"Call-IDs: {approx}{self.distinct_calls.count():,}  ({mode})")
+        
+        for title, sketch in (('DN', self.top_dns), ('Source IP', self.top_ips)):
+            print(f"\n[*] Busiest {title}s (top {limit}):")
+            print(f"{title:<22} {'Events':>10} {'Error':>8}")
+            print("-" * 42)
+            for item, count, error in sketch.top(limit):
+                print(f"{item:<22} {count:>10,} {error:>8,}")
+
+class LatencyHistogram:
+    """Log-linear (HDR style) histogram of millisecond latencies
+    
+    Values below 2**HISTOGRAM_SUB_BITS are counted exactly; every power of
+    two above that is split into 2**(HISTOGRAM_SUB_BITS - 1) linear
+    sub-buckets, so percentiles are within 1% at a few hundred counters
+    for any range of values.
+    """
+    __slots__ = ('counts', 'total', 'max')
+    
+    def __init__(self):
+        self.counts = defaultdict(int)  # bucket index -> count
+        self.total = 0
+        self.max = 0
+    
+    def record(self, value):
+        """Count one latency"""
+        value = max(int(value), 0)
+        shift = max(value.bit_length() - HISTOGRAM_SUB_BITS, 0)
+        self.counts[(shift << (HISTOGRAM_SUB_BITS - 1)) + (value >> shift)] += 1
+        self.total += 1
+        self.max = max(self.max, value)
+    
+    def percentile(self, percent):
+        """Value at the given percentile (bucket midpoint), 0 when empty"""
+        rank = max(-(-self.total * percent // 100), 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(_bucket_value(index), self.max)
+        return 0
+
+def _bucket_value(index):
+    """Midpoint of a LatencyHistogram bucket"""
+    half = 1 << (HISTOGRAM_SUB_BITS - 1)
+    if index < 2 * half:
+        return index
+    shift = index // half - 1
+    return ((index - shift * half) << shift) + (1 << shift) // 2
+
+class RegistrationTracker:
+    """Correlate REGISTER requests with their responses on (Call-ID, CSeq)
+    
+    Open transactions live in a hash table and expire TRANSACTION_TIMEOUT_MS
+    (log time) after the request. A repeated request for an open or closed
+    transaction (its final response lost) is a retransmission, as is a
+    repeated final response for a closed transaction. A 401/407 answered by
+    a REGISTER with the next CSeq on the same Call-ID is a challenge round
+    trip. Latency from request to final response is recorded per DN and per
+    source IP.
+    """
+    def __init__(self, timeout_ms=TRANSACTION_TIMEOUT_MS):
+        self.timeout_ms = timeout_ms
+        # Every table value starts with its expiry deadline (log time, epoch ms)
+        self.pending = {}  # (call_id, cseq) -> (deadline, request ts, dn, ip, first ts if challenged)
+        self.closed = {}  # (call_id, cseq) -> (deadline,), to spot response retransmissions
+        self.challenged = {}  # call_id -> (deadline, cseq, first request ts) after a 401/407
+        self.deadlines = deque()  # (deadline, table, key), in log order
+        self.by_dn = defaultdict(LatencyHistogram)
+        self.by_ip = defaultdict(LatencyHistogram)
+        self.overall = LatencyHistogram()
+        self.round_trips = LatencyHistogram()  # first REGISTER -> 200 OK across a challenge
+        self.answered = 0
+        self.retransmissions = 0
+        self.response_retransmissions = 0
+        self.unanswered = 0
+        self.pending_at_end = 0
+        self.orphans = 0
+        self.challenges = 0
+    
+    def add_event(self, event):
+        """Feed a REGISTER_REQUEST / 200_OK / UNREGISTER_OK event"""
+        if event.type == 'REGISTER_REQUEST':
+            self.request(event.call_id, event.cseq, event.ts, event.dn, event.ip)
+        else:
+            self.response(event.call_id, event.cseq, event.ts, 200)
+    
+    def add_failure(self, failure):
+        """Feed a 4xx response; only responses to a REGISTER carry a CSeq"""
+        if failure['cseq'] is not None and failure['ts'] is not None:
+            self.response(failure['call_id'], failure['cseq'], failure['ts'],
+                          int(failure['status_code']))
+    
+    def request(self, call_id, cseq, ts, dn, ip):
+        """A REGISTER was received"""
+        if call_id is None or cseq is None:
+            return
+        self.expire(ts)
+        key = (call_id, cseq)
+        if key in self.pending or key in self.closed:
+            self.retransmissions += 1
+            return
+        
+        first_ts = None
+        challenge = self.challenged.pop(call_id, None)
+        if challenge is not None and cseq > challenge[1]:
+            first_ts = challenge[2]
+        self._add(self.pending, key, ts, request_ts=ts, dn=dn, ip=ip, first_ts=first_ts)
+    
+    def response(self, call_id, cseq, ts, status):
+        """A final response to a REGISTER was sent"""
+        self.expire(ts)
+        key = (call_id, cseq)
+        entry = self.pending.pop(key, None)
+        if entry is None:
+            if key in self.closed:
+                self.response_retransmissions += 1
+            else:
+                self.orphans += 1
+            return
+        
+        _, request_ts, dn, ip, first_ts = entry
+        self._add(self.closed, key, ts)
+        self.answered += 1
+        latency = ts - request_ts
+        self.overall.record(latency)
+        self.by_dn[dn].record(latency)
+        self.by_ip[ip].record(latency)
+        
+        if status in (401, 407):
+            self.challenges += 1
+            self._add(self.challenged, call_id, ts, cseq=cseq,
+                      first_ts=first_ts if first_ts is not None else request_ts)
+        elif status == 200 and first_ts is not None:
+            self.round_trips.record(ts - first_ts)
+    
+    def _add(self, table, key, ts, **values):
+        """Store (deadline, *values) under key and schedule its expiry"""
+        deadline = ts + self.timeout_ms
+        table[key] = (deadline, *values.values())
+        self.deadlines.append((deadline, table, key))
+    
+    def expire(self, now):
+        """Drop open transactions, closed keys and challenges past their deadline"""
+        deadlines = self.deadlines
+        while deadlines and deadlines[0][0] < now:
+            deadline, table, key = deadlines.popleft()
+            value = table.get(key)
+            # The key may have been removed or stored again since
+            if value is not None and value[0] == deadline:
+                del table[key]
+                if table is self.pending:
+                    self.unanswered += 1
+    
+    def finish(self):
+        """Count the transactions still open at the end of the log"""
+        self.pending_at_end = len(self.pending)
+
+def _failure_ts(failure):
+    """Merge key of a failure record; failures without a timestamp sort first"""
+    return failure['ts'] if failure['ts'] is not None else 0
+
+def _categorical(values):
+    """Dictionary-encode values, return (categories, codes)"""
+    categories = {}
+    codes = [categories.setdefault(value, len(categories)) for value in values]
+    return list(categories), codes
+
+def format_ts(ts):
+    """YYYY-MM-DD HH:MM:SS.mmm of an epoch ms log timestamp"""
+    return datetime.fromtimestamp(ts / 1000, timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+
+def log_file_date(log_file):
+    """Date a SIP_P log starts on, from its SIP_P-001.YYYYMMDD_HHMMSS_mmm.log name
+    
+    Falls back to the file's modification date, and to today for a pattern.
+    """
+    name_match = LOG_NAME_RE.search(Path(log_file).name)
+    if name_match:
+        return datetime.strptime(name_match.group(1), '%Y%m%d').date()
+    if Path(log_file).is_file():
+        return datetime.fromtimestamp(Path(log_file).stat().st_mtime).date()
+    return date.today()
+
+def time_of_day_ms(timestamp):
+    """Milliseconds since midnight of an HH:MM:SS.mmm log timestamp, None if malformed"""
+    time_match = TIME_OF_DAY_RE.match(timestamp)
+    if not time_match:
+        return None
+    hours, minutes, seconds, millis = map(int, time_match.groups())
+    return ((hours * 60 + minutes) * 60 + seconds) * 1000 + millis
+
+def log_day_ms(log_start, time_ms):
+    """Epoch ms of a time of day within a log starting at log_start (day_ms, time of day)
+    
+    Times before the log start (less LOG_START_SLACK_MS) belong to the next day.
+    """
+    day_ms, start_ms = log_start
+    if time_ms < start_ms - LOG_START_SLACK_MS:
+        day_ms += DAY_MS
+    return day_ms + time_ms
+
+def time_bound(value, log_file):
+    """Epoch ms of a --since/--until value, None if it is not a valid time
+    
+    Takes a date and time (2026-01-16 22:30:00, log clock) or a time of day
+    (22:30, 22:30:15.250), which is placed on the day of log_file that
+    follows its start, so a time before the log start means the next day.
+    """
+    time_match = TIME_ARG_RE.match(value)
+    if time_match:
+        hours, minutes, seconds, millis = time_match.groups()
+        time_ms = ((int(hours) * 60 + int(minutes)) * 60 + int(seconds or 0)) * 1000
+        time_ms += int((millis or '0').ljust(3, '0'))
+        clock = log_clock(log_file)
+        return log_day_ms((clock.day_ms, clock.last), time_ms)
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return calendar.timegm(moment.timetuple()) * 1000 + moment.microsecond // 1000
+
+def log_clock(log_file):
+    """LogClock starting at the date and time in a SIP_P log's file name"""
+    name_match = LOG_NAME_RE.search(Path(log_file).name)
+    start_ms = 0
+    if name_match:
+        hhmmss, millis = name_match.group(2), name_match.group(3)
+        start_ms = time_of_day_ms(f"{hhmmss[:2]}:{hhmmss[2:4]}:{hhmmss[4:]}.{millis}")
+    return LogClock(log_file_date(log_file), start_ms)
+
+def is_compressed(log_file):
+    """True for a gzip/bzip2/xz/zstd archived log"""
+    return str(log_file).endswith(COMPRESSED_SUFFIXES)
+
+def open_log(log_file):
+    """Open a SIP log for binary line iteration, decompressing on the fly
+    
+    .gz, .bz2 and .xz use the standard library, .zst needs the zstandard
+    package. Data is decompressed in memory as it is read, without
+    temporary files.
+    """
+    log_file = str(log_file)
+    if log_file.endswith('.gz'):
+        return gzip.open(log_file, 'rb')
+    if log_file.endswith('.bz2'):
+        return bz2.open(log_file, 'rb')
+    if log_file.endswith('.xz'):
+        return lzma.open(log_file, 'rb')
+    if log_file.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            print("[-] Error: reading .zst logs requires the zstandard package")
+            sys.exit(1)
+        reader = zstandard.ZstdDecompressor().stream_reader(open(log_file, 'rb'), closefd=True)
+        return io.BufferedReader(reader, buffer_size=STREAM_BUFFER_SIZE)
+    return open(log_file, 'rb', buffering=STREAM_BUFFER_SIZE)
+
+def _iter_range(f, start, end):
+    """Yield the raw lines of f that start inside [start, end), end None for EOF"""
+    if end is None:
+        yield from f
+        return
+    
+    f.seek(start)
+    offset = start
+    for raw in f:
+        if offset >= end:
+            break
+        yield raw
+        offset += len(raw)
+
+def _read_blocks(f, offsets):
+    """Yield the MESSAGE_WINDOW raw lines starting at each of the ascending offsets
+    
+    f is only read forward: a seekable file seeks to the next offset, a
+    stream that cannot seek (.zst) reads and drops the bytes up to it. Lines
+    already read for the previous block are reused when the next one starts
+    inside its window.
+    """
+    seekable = f.seekable()
+    window = deque()  # (offset, raw line) read ahead, consecutive
+    position = 0  # offset of the next unread byte
+    for offset in offsets:
+        while window and window[0][0] < offset:
+            window.popleft()
+        if not window and position != offset:
+            if seekable:
+                f.seek(offset)
+                position = offset
+            while position < offset:
+                skipped = len(f.read(min(offset - position, STREAM_BUFFER_SIZE)))
+                if not skipped:
+                    break
+                position += skipped
+        while len(window) < MESSAGE_WINDOW:
+            raw = f.readline()
+            if not raw:
+                break
+            window.append((position, raw))
+            position += len(raw)
+        yield [raw for _, raw in window]
+
+def _line_time(f, offset):
+    """(offset, time of day ms) of the first HH:MM:SS.mmm line starting at or after offset
+    
+    None when there is none before EOF.
+    """
+    timestamped_line = PATTERNS[bytes].timestamped_line
+    if offset:
+        # Finish the line offset falls into (just its newline on a line start)
+        f.seek(offset - 1)
+        offset += len(f.readline()) - 1
+    else:
+        f.seek(0)
+    
+    for raw in f:
+        if timestamped_line.match(raw):
+            return offset, time_of_day_ms(raw[:12].decode('ascii'))
+        offset += len(raw)
+    return None
+
+def _find_offset(f, size, log_start, ts):
+    """Byte offset of the first timestamped line at or after epoch ms ts (size if none)"""
+    lo, hi = 0, size
+    while lo < hi:
+        mid = (lo + hi) // 2
+        line_time = _line_time(f, mid)
+        if line_time is None or log_day_ms(log_start, line_time[1]) >= ts:
+            hi = mid
+        else:
+            lo = mid + 1
+    
+    line_time = _line_time(f, lo)
+    return line_time[0] if line_time else size
+
+def _next_boundary(f, offset):
+    """Find the first message start at or after offset that is safe to split on
+
+    A split is safe on the first 'SIPTR: Received'/'Sending' line following a
+    blank line: every handler stops at the blank line that ends its header
+    block, so no message window can straddle the split and the serial scan
+    reaches the split line exactly as a chunk worker would.
+    """
+    f.seek(offset)
+    pos = offset + len(f.readline()) if offset else 0  # skip the partial line
+    after_blank = False
+    
+    for raw in f:
+        if after_blank and (b'SIPTR: Received' in raw or b'Sending' in raw):
+            return pos
+        if not raw.strip():
+            after_blank = True
+        pos += len(raw)
+    
+    return pos
+
+def _join_lines(raw_lines):
+    """Re-join a line that was split between the carry buffer and new data"""
+    partial = b''
+    for raw in raw_lines:
+        if partial:
+            raw, partial = partial + raw, b''
+        if not raw.endswith(b'\n'):
+            partial = raw
+            continue
+        yield raw
+    if partial:
+        yield partial
+
+def _is_complete(lines):
+    """Whether the head of a window can be handled without reading further
+    
+    Message starts need the blank line that ends their header block; every
+    other line is handled on its own.
+    """
+    if classify_line(lines[0]) != MESSAGE_START:
+        return True
+    return any(not line.strip() for line in islice(lines, 2, MESSAGE_WINDOW))
+
+def load_checkpoint(checkpoint_file):
+    """Load a parser checkpoint, None if missing or unreadable"""
+    try:
+        with open(checkpoint_file, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_checkpoint(checkpoint_file, checkpoint):
+    """Atomically write a parser checkpoint"""
+    tmp_file = f"{checkpoint_file}.tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_file, checkpoint_file)
+
+class LogIndex:
+    """Sidecar index of a log: <log_file>.idx, an SQLite database
+    
+    blocks holds the offset and ts of every REGISTER / 200 OK block once,
+    terms numbers each DN, Call-ID and IP in INDEX_KEYS once, and entries
+    maps a term to the offsets of the blocks it appears in, so a lookup reads
+    only its own rows. meta records how far the log was indexed (up to the
+    last complete message) and the log clock there, so a grown log is only
+    scanned from that offset on; a rotated (new inode) or truncated log is
+    indexed again from the start. Offsets of compressed logs are positions in
+    the decompressed data.
+    """
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS meta (
+            log_file TEXT NOT NULL,
+            inode INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            offset INTEGER NOT NULL,
+            day_ms INTEGER,
+            last INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS blocks (
+            offset INTEGER PRIMARY KEY,
+            ts INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS terms (
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            id INTEGER NOT NULL,
+            PRIMARY KEY (key, value)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS entries (
+            term INTEGER NOT NULL,
+            offset INTEGER NOT NULL,
+            PRIMARY KEY (term, offset)
+        ) WITHOUT ROWID;
+    '''
+    
+    def __init__(self, log_file):
+        self.log_file = log_file
+        self.index_file = f"{log_file}{INDEX_SUFFIX}"
+        try:
+            self.db = sqlite3.connect(self.index_file)
+            self.db.executescript(self.SCHEMA)
+        except sqlite3.DatabaseError:
+            # An index from before it was a database: build it again
+            self.db.close()
+            os.remove(self.index_file)
+            self.db = sqlite3.connect(self.index_file)
+            self.db.executescript(self.SCHEMA)
+    
+    def update(self):
+        """Index the part of the log appended since the last update"""
+        stat = Path(self.log_file).stat()
+        compressed = is_compressed(self.log_file)
+        meta = self.db.execute('SELECT inode, size, offset, day_ms, last FROM meta').fetchone()
+        if (meta is None or meta[0] != stat.st_ino or stat.st_size < meta[1] or
+                (compressed and stat.st_size != meta[1])):
+            with self.db:
+                self.db.execute('DELETE FROM meta')
+                self.db.execute('DELETE FROM blocks')
+                self.db.execute('DELETE FROM terms')
+                self.db.execute('DELETE FROM entries')
+                self.db.execute('INSERT INTO meta VALUES (?, ?, 0, 0, NULL, NULL)',
+                                (str(self.log_file), stat.st_ino))
+            meta = (stat.st_ino, 0, 0, None, None)
+        _, size, offset, day_ms, last = meta
+        if size == stat.st_size:
+            return
+        
+        parser = SIPLogParser(self.log_file, max_events=1)
+        if day_ms is not None:
+            parser.clock.day_ms, parser.clock.last = day_ms, last
+        blocks = []
+        entries = []
+        terms = {}  # (key, value) -> id, of the terms met in this update
+        next_id = self.db.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM terms').fetchone()[0]
+        
+        def add_block(event):
+            nonlocal next_id
+            # Listeners run while the event's start line is the window head
+            blocks.append((parser.offset, event.ts))
+            for key in INDEX_KEYS:
+                value = getattr(event, key)
+                if not value or value == 'Unknown':
+                    continue
+                term = terms.get((key, value))
+                if term is None:
+                    row = self.db.execute('SELECT id FROM terms WHERE key = ? AND value = ?',
+                                          (key, value)).fetchone()
+                    if row is None:
+                        row = (next_id,)
+                        self.db.execute('INSERT INTO terms VALUES (?, ?, ?)', (key, value, next_id))
+                        next_id += 1
+                    term = terms[key, value] = row[0]
+                entries.append((term, parser.offset))
+            if len(blocks) >= SQLITE_BATCH_SIZE:
+                self._insert(blocks, entries)
+        parser.listeners.append(add_block)
+        
+        # One transaction: an interrupted update leaves the previous index intact
+        with self.db, open_log(self.log_file) as f:
+            if compressed:
+                parser._scan(f)
+            else:
+                parser._scan(_iter_range(f, offset, stat.st_size),
+                             start_offset=offset, final=False)
+            self._insert(blocks, entries)
+            self.db.execute('UPDATE meta SET size = ?, offset = ?, day_ms = ?, last = ?',
+                            (stat.st_size, parser.offset, parser.clock.day_ms, parser.clock.last))
+    
+    def _insert(self, blocks, entries):
+        self.db.executemany('INSERT OR IGNORE INTO blocks VALUES (?, ?)', blocks)
+        self.db.executemany('INSERT OR IGNORE INTO entries VALUES (?, ?)', entries)
+        blocks.clear()
+        entries.clear()
+    
+    def blocks(self, key, value):
+        """(offset, ts) of the blocks key == value appears in, in log order"""
+        return self.db.execute(
+            'SELECT offset, ts FROM terms JOIN entries ON term = id JOIN blocks USING (offset) '
+            'WHERE key = ? AND value = ? ORDER BY offset', (key, value)).fetchall()
+    
+    def counts(self):
+        """Distinct indexed values per key"""
+        counts = dict(self.db.execute(
+            'SELECT key, COUNT(*) FROM terms GROUP BY key'))
+        return {key: counts.get(key, 0) for key in INDEX_KEYS}
+    
+    def close(self):
+        self.db.close()
+
+def update_index(log_file):
+    """Build or extend the sidecar index of a log and return it, open (see LogIndex)"""
+    index = LogIndex(log_file)
+    index.update()
+    return index
+
+def _parse_range(log_file, start, end, bytes_mode=False, since=None, until=None, dns=None):
+    """Process pool worker: parse one byte range of a log file (whole file for end None)"""
+    parser = SIPLogParser(log_file, bytes_mode=bytes_mode, since=since, until=until, dns=dns)
+    with open_log(log_file) as f:
+        total_lines = parser._scan(_iter_range(f, start, end))
+    return parser.events, parser.failed_registrations, total_lines
+
+def glob_logs(pattern):
+    """Files matching pattern, plus compressed rotations of them (pattern.gz, ...)"""
+    log_files = set(glob.glob(pattern))
+    for suffix in COMPRESSED_SUFFIXES:
+        log_files.update(glob.glob(pattern + suffix))
+    return list(log_files)
+
+def log_sort_key(log_file):
+    """Rotation time of a log: from its name, as compressing it may touch the mtime"""
+    name_match = LOG_NAME_RE.search(Path(log_file).name)
+    if name_match:
+        return '_'.join(name_match.groups())
+    return datetime.fromtimestamp(Path(log_file).stat().st_mtime).strftime('%Y%m%d_%H%M%S_%f')
 
 def find_latest_log(pattern='SIP_P-001.*.log'):
     """Find the latest SIP log file"""
-    log_files = glob.glob(pattern)
+    log_files = glob_logs(pattern)
     if not log_files:
         return None
     
-    # Sort by modification time, most recent first
-    log_files.sort(key=lambda x: Path(x).stat().st_mtime, reverse=True)
+    # Sort by rotation time, most recent first
+    log_files.sort(key=log_sort_key, reverse=True)
     return log_files[0]
 
+def find_log_files(pattern='SIP_P-001.*.log'):
+    """Find all rotated SIP log files for a glob or directory, oldest first"""
+    if Path(pattern).is_dir():
+        pattern = str(Path(pattern) / 'SIP_P-001.*.log')
+    
+    log_files = glob_logs(pattern)
+    log_files.sort(key=log_sort_key)
+    return log_files
+
+def lookup_arg(value):
+    """argparse type of --lookup: 'dn=5003' -> ('dn', '5003')"""
+    key, _, lookup_value = value.partition('=')
+    if key not in INDEX_KEYS or not lookup_value:
+        raise argparse.ArgumentTypeError(f"expected one of {', '.join(INDEX_KEYS)}=VALUE")
+    return key, lookup_value
+
+def time_bounds(args, log_file):
+    """since/until parser options from the command line, relative to log_file"""
+    bounds = {}
+    for name in ('since', 'until'):
+        value = getattr(args, name)
+        if value is not None:
+            bounds[name] = time_bound(value, log_file)
+            if bounds[name] is None:
+                print(f"[-] Error: invalid --{name} time: {value}")
+                sys.exit(1)
+    return bounds
+
 def main():
-    # Find latest log file
-    if len(sys.argv) > 1:
-        log_file = sys.argv[1]
+    arg_parser = argparse.ArgumentParser(description='Genesys SIP Server log parser')
+    arg_parser.add_argument('log_file', nargs='?',
+                            help='SIP_P log to parse (default: latest SIP_P-001.*.log); '
+                                 'a glob or directory with --all')
+    arg_parser.add_argument('--workers', type=int, metavar='N',
+                            help='parse in N processes (default: 1, CPU count with --all)')
+    arg_parser.add_argument('--all', action='store_true',
+                            help='parse and merge every rotated SIP_P-001.*.log[.gz|.bz2|.xz|.zst]')
+    arg_parser.add_argument('--bytes', action='store_true',
+                            help='scan raw bytes and decode only the extracted values')
+    arg_parser.add_argument('--columnar', metavar='BASENAME', nargs='?', const='sip-registrations',
+                            help='also export events to BASENAME.parquet (pyarrow) or .npz (numpy)')
+    arg_parser.add_argument('--checkpoint', metavar='FILE',
+                            help='resume from FILE and parse only appended bytes')
+    arg_parser.add_argument('--ndjson', metavar='FILE',
+                            help="stream events to FILE as NDJSON instead of the JSON export "
+                                 "('-' for stdout, reports then go to stderr)")
+    arg_parser.add_argument('--compress', choices=['gzip', 'zstd'],
+                            help='compress the NDJSON stream')
+    arg_parser.add_argument('--since', metavar='TIME',
+                            help="only events at or after TIME ('HH:MM[:SS[.mmm]]' or "
+                                 "'YYYY-MM-DD HH:MM:SS'); seeks instead of reading the whole log")
+    arg_parser.add_argument('--until', metavar='TIME',
+                            help='only events at or before TIME')
+    arg_parser.add_argument('--dn', action='append', metavar='DN',
+                            help='only events of DN (repeatable)')
+    arg_parser.add_argument('--latency', action='store_true',
+                            help='correlate REGISTER transactions and report latency percentiles')
+    arg_parser.add_argument('--analytics', nargs='?', const='sketch', choices=['sketch', 'exact'],
+                            help='fixed-memory top-N and distinct counts (default: sketch), '
+                                 'or exact counts for comparison; the JSON export keeps '
+                                 'only the last 20 events')
+    arg_parser.add_argument('--index', action='store_true',
+                            help='build or update the sidecar index (<log>.idx) and exit')
+    arg_parser.add_argument('--lookup', metavar='KEY=VALUE', type=lookup_arg,
+                            help='parse only the blocks indexed for dn=, call_id= or ip=')
+    arg_parser.add_argument('--sqlite', metavar='DB',
+                            help='also store events and current registrations in the SQLite '
+                                 'database DB; later runs append to it')
+    arg_parser.add_argument('--follow', action='store_true',
+                            help='keep tailing the log (and its rotations) after parsing it, '
+                                 'redrawing the reports as messages arrive; the JSON export '
+                                 'written on Ctrl-C keeps only the last 20 events')
+    arg_parser.add_argument('--interval', type=float, default=2.0, metavar='SECONDS',
+                            help='poll / redraw interval of --follow (default: 2)')
+    args = arg_parser.parse_args()
+    
+    exporter = NDJSONExporter(args.ndjson, args.compress) if args.ndjson else None
+    
+    # Keep stdout clean for jq / log shippers reading the NDJSON stream
+    with contextlib.redirect_stdout(sys.stderr) if args.ndjson == '-' else contextlib.nullcontext():
+        run(args, exporter)
+
+def run(args, exporter=None):
+    """Parse, report and export according to the command line"""
+    options = {'bytes_mode': args.bytes, 'dns': args.dn, 'track_latency': args.latency,
+               'analytics': args.analytics}
+    if exporter:
+        options['listeners'] = [exporter.write_event]
+    if (exporter or args.analytics or args.follow) and not args.columnar:
+        # Events are streamed out, summarised or followed as they are parsed,
+        # keep only the timeline tail so memory stays fixed
+        options['max_events'] = 20
+    
+    if args.all:
+        pattern = args.log_file or 'SIP_P-001.*.log'
+        log_files = find_log_files(pattern)
+        if not log_files:
+            print(f"[-] Error: No SIP log files found for: {pattern}")
+            sys.exit(1)
     else:
-        log_file = find_latest_log('SIP_P-001.*.log')
+        # Find latest log file
+        log_file = args.log_file or find_latest_log('SIP_P-001.*.log')
+        
+        if not log_file or not Path(log_file).exists():
+            print("[-] Error: No SIP log file found!")
+            print("Usage: python sip-log-parser.py [log_file] [--workers N] [--all]")
+            print("Or place SIP_P-001.*.log in current directory")
+            sys.exit(1)
+        log_files = [log_file]
     
-    if not log_file or not Path(log_file).exists():
-        print("[-] Error: No SIP log file found!")
-        print("Usage: python sip-log-parser.py [log_file]")
-        print("Or place SIP_P-001.*.log in current directory")
+    if args.follow and (args.all or args.index or args.lookup or args.checkpoint or
+                        is_compressed(log_files[0])):
+        print("[-] Error: --follow tails a single plain log and cannot be combined "
+              "with --all, --index, --lookup or --checkpoint")
         sys.exit(1)
     
+    if args.index:
+        for log_file in log_files:
+            index = update_index(log_file)
+            counts = index.counts()
+            index.close()
+            print(f"[+] {log_file}{INDEX_SUFFIX}: " +
+                  ', '.join(f"{counts[key]:,} {key}" for key in INDEX_KEYS))
+        return
+    
     # Parse the log
-    parser = SIPLogParser(log_file)
-    parser.parse()
+    store = SQLiteStore(args.sqlite) if args.sqlite else None
+    if store:
+        options['listeners'] = options.get('listeners', []) + [store.write_event]
+    options.update(time_bounds(args, log_files[0]))
+    parser = SIPLogParser(pattern if args.all else log_files[0], **options)
+    if args.follow:
+        def redraw():
+            if store:
+                store.flush()
+            print_reports(parser, args, clear=True)
+        parser.follow(args.interval, redraw=redraw)
+    elif args.lookup:
+        parser.parse_lookup(log_files, *args.lookup)
+    elif args.all:
+        parser.parse_many(log_files, workers=args.workers)
+    elif args.checkpoint:
+        parser.parse_incremental(args.checkpoint)
+    else:
+        parser.parse(workers=args.workers or 1)
     
-    # Print reports
-    parser.print_summary()
-    parser.print_timeline(limit=20)
-    parser.print_failed_registrations(limit=10)
+    print_reports(parser, args)
     
     # Export to JSON
-    parser.export_json()
+    if exporter:
+        exporter.close(parser.summary_record())
+        print(f"\n[+] Streamed {exporter.count:,} records to: {args.ndjson}")
+    else:
+        parser.export_json()
+    if store:
+        store.close()
+        print(f"[+] Stored {store.count:,} new events in: {args.sqlite}")
+    if args.columnar:
+        parser.export_columnar(args.columnar)
     
     print("\n[+] Parsing complete!")
 
+def print_reports(parser, args, clear=False):
+    """Print the summary, timeline, failures and latency; clear redraws a terminal"""
+    if clear and sys.stdout.isatty():
+        print("\033[2J\033[H", end='')
+    parser.print_summary()
+    parser.print_timeline(limit=20)
+    parser.print_failed_registrations(limit=10)
+    if args.latency:
+        parser.print_latency()
+
 if __name__ == '__main__':
     main()